@@ -1,44 +1,116 @@
 import json
+import mimetypes
 import os
 import random
 import string
+import time
 from functools import wraps
-from operator import itemgetter
-from typing import Final, Optional, cast
+from typing import Final, Iterable, Iterator, Optional
 
 import httplib2
 import requests
-from db_models import Base, Region, User, Whiskey
+from batch import MAX_BATCH_IDS, batch_select, ids_from_json, in_request_order, parse_ids
+from blobstore import add_ref, blob_dir, is_blob_name, release, remove, store
+from cache import TTLCache
+from changes import current_seq_select, feed_page, feed_selects, parse_since
+from db_engine import make_engine, settings_from_env
+from db_models import (
+    CHANGE_FEED,
+    Base,
+    CatalogVersion,
+    Region,
+    Tombstone,
+    User,
+    Whiskey,
+    catalog_validators,
+    ensure_catalog_versions,
+    parse_strength,
+    reserve_change_seqs,
+    utcnow,
+)
+from db_routing import ReplicaSet, RoutingSession
+from facets import facet_counts, facet_select, filtered_select, parse_filters
 from flask import (
     Flask,
+    Response,
+    abort,
     flash,
-    jsonify,
+    g,
     make_response,
     redirect,
     render_template,
     request,
     send_from_directory,
+    stream_template,
+    stream_with_context,
     url_for,
 )
 from flask import session as login_session
+from flask.sessions import SecureCookieSessionInterface
 from flask_seasurf import SeaSurf
+from fragments import FragmentCacheExtension, skip_fragment_cache
+from jinja2 import FileSystemBytecodeCache
+from metrics import metrics
+from metrics import init_app as init_metrics
 from oauth2client.client import FlowExchangeError, flow_from_clientsecrets
-from sqlalchemy import asc, create_engine, desc, func
+from paging import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    STREAM_BATCH_SIZE,
+    STREAM_CHUNK_SIZE,
+    page_select,
+    parse_page_args,
+    split_page,
+)
+from search import ensure_search_index, search_whiskeys
+from serializers import REGION_PROJECTION, WHISKEY_PROJECTION, Projection, dumps
+from sqlalchemy import asc, desc, func, select, update
 from sqlalchemy.exc import NoResultFound
-from sqlalchemy.orm import sessionmaker
-from werkzeug.utils import secure_filename
+from sqlalchemy.orm import (
+    configure_mappers,
+    joinedload,
+    scoped_session,
+    sessionmaker,
+)
+from thumbnails import (
+    DERIVATIVE_SIZES,
+    derivative_name,
+    has_derivative,
+    makes_derivatives,
+    queue_derivatives,
+    remove_derivatives,
+)
+from werkzeug.utils import safe_join
 
 # Absolute path for database file (useful for debugging/logging)
 f = os.path.abspath("whiskey_regions.db")
 
-# Create SQLAlchemy engine and create tables if they don't exist
-engine = create_engine('sqlite:///whiskey_regions.db')
-Base.metadata.create_all(engine)
+
+class PublicResponseSessionInterface(SecureCookieSessionInterface):
+    """
+    Leaves the session cookie and Vary: Cookie off responses marked public,
+    which are the same for every visitor, so shared caches can store them.
+    """
+
+    def save_session(self, app, session, response):
+        if response.cache_control.public and not session.modified:
+            return
+        super().save_session(app, session, response)
+
 
 # Initialize Flask app and CSRF protection via flask-seasurf
 app = Flask(__name__)
+app.session_interface = PublicResponseSessionInterface()
 csrf = SeaSurf(app)
 
+
+@csrf.disable_cookie
+def public_response(response) -> bool:
+    """
+    Public responses hold no forms, so they need no CSRF cookie.
+    """
+    return bool(response.cache_control.public)
+
 # ------------------------
 # Upload configuration
 # ------------------------
@@ -47,24 +119,89 @@ ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16 MB max upload size
 
+# How uploads are sent: "" streams them from Flask, "x-sendfile" hands the
+# path to Apache/lighttpd, "x-accel-redirect" hands an internal URI to nginx
+# (served from UPLOAD_ACCEL_PREFIX, an internal location aliased to the
+# upload folder).
+app.config["UPLOAD_SENDFILE"] = os.environ.get("UPLOAD_SENDFILE", "").lower()
+app.config["UPLOAD_ACCEL_PREFIX"] = os.environ.get("UPLOAD_ACCEL_PREFIX", "/protected-uploads")
+app.config["USE_X_SENDFILE"] = app.config["UPLOAD_SENDFILE"] == "x-sendfile"
+# Cache lifetime in seconds of uploads that are not content-addressed
+app.config["UPLOAD_MAX_AGE"] = int(os.environ.get("UPLOAD_MAX_AGE", "3600"))
+
 # ------------------------
-# Load Google OAuth client ID
+# Google OAuth client (loaded by create_app)
 # ------------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CLIENT_SECRET_PATH = os.path.join(BASE_DIR, "client_secret.json")
 
-with open(CLIENT_SECRET_PATH, "r") as f:
-    CLIENT_ID = json.load(f)["web"]["client_id"]
-
 APPLICATION_NAME: Final[str] = "Whiskey Regions Web App"
 
+# ------------------------
+# Database engine and pool configuration
+# ------------------------
+app.config.update(settings_from_env())
+
+# Engines connect lazily; tables are created by create_app or db_migrate.py
+engine = make_engine(settings=app.config)
+
+# Read replicas (DATABASE_REPLICA_URLS) serve the routes marked @replica_reads
+replicas = ReplicaSet(
+    [make_engine(url, settings=app.config) for url in app.config["DATABASE_REPLICA_URLS"]],
+    retry_seconds=app.config["REPLICA_RETRY_SECONDS"],
+)
+
+
+def dispose_pools_after_fork() -> None:
+    """
+    A forked worker must not share the parent's pooled connections; drop
+    them from the child's pools without closing the parent's sockets.
+    """
+    for e in (engine, *replicas.engines):
+        e.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=dispose_pools_after_fork)
+
+# ------------------------
+# Request instrumentation
+# ------------------------
+# Statements slower than this many milliseconds are logged with their route
+app.config["SLOW_QUERY_MS"] = float(os.environ.get("SLOW_QUERY_MS", "200"))
+# Send per-request db/render/serialize timings in a Server-Timing header
+app.config["SERVER_TIMING"] = os.environ.get("SERVER_TIMING", "true").lower() == "true"
+init_metrics(app, engine, *replicas.engines)
+
+# ------------------------
+# Template rendering
+# ------------------------
+# Compiled templates are kept on disk so new workers load bytecode instead of
+# parsing (default: a per-user directory under the system temp dir)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(os.environ.get("TEMPLATE_CACHE_DIR"))
+
+# {% cache %} fragments live this many seconds; 0 turns fragment caching off
+FRAGMENT_CACHE_TTL: Final[int] = int(os.environ.get("FRAGMENT_CACHE_TTL", "600"))
+FRAGMENT_CACHE_SIZE: Final[int] = int(os.environ.get("FRAGMENT_CACHE_SIZE", "1000"))
+app.jinja_env.add_extension(FragmentCacheExtension)
+if FRAGMENT_CACHE_TTL > 0:
+    app.jinja_env.fragment_cache = TTLCache(ttl=FRAGMENT_CACHE_TTL, max_entries=FRAGMENT_CACHE_SIZE)
+
 # ------------------------
 # Database session setup
 # ------------------------
-engine = create_engine("sqlite:///whiskey_regions.db")
-Base.metadata.bind = engine
-DBSession = sessionmaker(bind=engine)
-session = DBSession()
+# Each request thread gets its own session (and pooled connection) from the
+# scoped registry; it is returned to the pool when the app context tears down.
+DBSession = sessionmaker(bind=engine, class_=RoutingSession, replicas=replicas)
+session = scoped_session(DBSession)
+
+
+@app.teardown_appcontext
+def shutdown_session(exception=None):
+    """
+    Close the request's session and release its connection back to the pool.
+    """
+    session.remove()
+
 
 # ------------------------
 # Login required decorator
@@ -82,15 +219,235 @@ def login_required(f):
     return decorated_function
 
 
+# ------------------------
+# Replica routing
+# ------------------------
+# After a user writes, their reads stay on the primary for this many seconds
+# so they see their own change before the replicas catch up.
+app.config["REPLICA_STICKY_SECONDS"] = float(os.environ.get("REPLICA_STICKY_SECONDS", "5"))
+
+
+def mark_write() -> None:
+    """
+    Remember that this browser session just wrote to the primary.
+    """
+    login_session["wrote_at"] = time.time()
+
+
+def replica_reads(f):
+    """
+    Decorator for read-only routes: run the view's queries on a replica,
+    unless this browser session wrote within REPLICA_STICKY_SECONDS.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        since_write = time.time() - login_session.get("wrote_at", 0)
+        session.info["replica"] = since_write > app.config["REPLICA_STICKY_SECONDS"]
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+# ------------------------
+# Catalog versions and conditional GETs
+# ------------------------
+def bump_catalog_version(*entities: str) -> None:
+    """
+    Mark entities as changed. Call before committing the write so the new
+    stamp becomes visible in the same transaction as the data.
+    """
+    mark_write()
+    session.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.entity.in_(entities))
+        .values(version=CatalogVersion.version + 1, updated_at=utcnow())
+    )
+
+
+def record_changes(*rows) -> None:
+    """
+    Stamp regions or whiskeys being added or edited with new change feed
+    numbers (see changes.py). Call before committing the write.
+    """
+    for row, seq in zip(rows, reserve_change_seqs(session, len(rows))):
+        row.change_seq = seq
+
+
+def record_delete(entity: str, entity_id: int) -> None:
+    """
+    Leave a tombstone in the change feed for a deleted row.
+    """
+    seq = reserve_change_seqs(session)[0]
+    session.add(Tombstone(change_seq=seq, entity=entity, entity_id=entity_id))
+
+
+def conditional(*entities: str, private: bool = False):
+    """
+    Decorator for read routes whose output depends only on the given entities
+    (and, when private, on who is logged in).
+    Derives a strong ETag and Last-Modified from the change stamps and answers
+    304 Not Modified before the view runs when the client's copy is current.
+    Only GET and HEAD requests are revalidated, and only successful responses
+    carry the validators.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Pending flash messages are part of the page; always render them
+            if "_flashes" in login_session or request.method not in ("GET", "HEAD"):
+                return f(*args, **kwargs)
+
+            stamps = session.execute(
+                select(CatalogVersion.entity, CatalogVersion.version, CatalogVersion.updated_at)
+                .where(CatalogVersion.entity.in_(entities))
+                .order_by(CatalogVersion.entity)
+            ).all()
+            g.catalog_stamps = {s.entity: s.version for s in stamps}
+            viewer = [f"user:{login_session.get('user_id')}"] if private else []
+            etag, last_modified = catalog_validators(stamps, *viewer)
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                # Last-Modified does not change on login/logout, so private
+                # pages only revalidate by ETag
+                not_modified = (
+                    not private
+                    and last_modified is not None
+                    and request.if_modified_since is not None
+                    and request.if_modified_since >= last_modified
+                )
+
+            if not_modified:
+                response = Response(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if not 200 <= response.status_code < 300:
+                    return response
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            if private:
+                response.cache_control.private = True
+            else:
+                response.cache_control.public = True
+            return response
+        return decorated_function
+    return decorator
+
+
+@app.template_global()
+def catalog_version(*entities: str) -> str:
+    """
+    The current change stamps of entities, as a {% cache %} key part.
+    Reuses the stamps conditional() read for this request.
+    """
+    stamps = g.get("catalog_stamps", {})
+    missing = [e for e in entities if e not in stamps]
+    if missing:
+        stamps = {**stamps, **dict(session.execute(
+            select(CatalogVersion.entity, CatalogVersion.version)
+            .where(CatalogVersion.entity.in_(missing))
+        ).all())}
+        g.catalog_stamps = stamps
+    return "|".join(f"{e}:{stamps.get(e)}" for e in entities)
+
+
 # ------------------------
 # Helper functions for uploads
 # ------------------------
+# Uploads named by content hash never change, so clients may cache them forever
+IMMUTABLE_MAX_AGE: Final[int] = 365 * 24 * 60 * 60
+
+
+def send_upload(directory: str, filename: str, etag: Optional[str] = None) -> Response:
+    """
+    Send a stored file, or delegate sending it to the fronting proxy.
+    etag, when known up front (content-addressed files), answers
+    If-None-Match without touching the disk; otherwise Werkzeug derives one
+    from the file's stat. Range requests are honoured either way.
+    """
+    if is_blob_name(filename):
+        max_age = IMMUTABLE_MAX_AGE
+    else:
+        max_age = app.config["UPLOAD_MAX_AGE"]
+
+    if etag and request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif app.config["UPLOAD_SENDFILE"] == "x-accel-redirect":
+        path = safe_join(directory, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        relative = os.path.relpath(path, app.config["UPLOAD_FOLDER"]).replace(os.sep, "/")
+        response = Response(mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+        response.headers["X-Accel-Redirect"] = f"{app.config['UPLOAD_ACCEL_PREFIX']}/{relative}"
+    else:
+        return_etag = etag if etag else True
+        response = send_from_directory(directory, filename, etag=return_etag, max_age=max_age)
+
+    if etag:
+        response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if is_blob_name(filename):
+        response.cache_control.immutable = True
+    return response
+
+
 @app.route("/uploads/<filename>")
 def uploaded_file(filename):
     """
     Route to serve uploaded files from the upload folder.
+    Content-addressed uploads are served with far-future immutable caching.
+    """
+    # The content hash in the name is the ETag; no need to stat or re-hash
+    etag = filename.split(".", 1)[0] if is_blob_name(filename) else None
+    return send_upload(blob_dir(app.config["UPLOAD_FOLDER"], filename), filename, etag)
+
+
+@app.route("/uploads/<size>/<filename>")
+def uploaded_derivative(size, filename):
+    """
+    Route to serve a resized WebP derivative of an upload.
+    """
+    if size not in DERIVATIVE_SIZES:
+        return render_template("404.html"), 404
+    etag = f"{size}-{filename.split('.', 1)[0]}" if is_blob_name(filename) else None
+    return send_upload(os.path.join(app.config["UPLOAD_FOLDER"], size), filename, etag)
+
+
+@app.template_global()
+def upload_url(filename: str, size: Optional[str] = None) -> str:
+    """
+    URL of an upload at the given derivative size, falling back to the
+    original until the background worker has produced the derivative. A
+    fallback is left out of the fragment cache, so the page picks up the
+    derivative once it exists.
+    """
+    if size and has_derivative(app.config["UPLOAD_FOLDER"], size, filename):
+        return url_for("uploaded_derivative", size=size, filename=derivative_name(filename))
+    if size and makes_derivatives():
+        skip_fragment_cache()
+    return url_for("uploaded_file", filename=filename)
+
+
+def save_upload(file) -> tuple[str, int]:
     """
-    return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
+    Write an uploaded file into the content-addressed store and queue its
+    thumbnails. Returns (stored name, size in bytes).
+    """
+    ext = file.filename.rsplit(".", 1)[1].lower()
+    name, size = store(app.config["UPLOAD_FOLDER"], file.stream, ext)
+    queue_derivatives(app.config["UPLOAD_FOLDER"], name)
+    return name, size
+
+
+def remove_upload(filename: str) -> None:
+    """
+    Delete an upload and its derivatives. Only call once nothing references
+    it (see blobstore.release) and the releasing transaction has committed.
+    """
+    remove(app.config["UPLOAD_FOLDER"], filename)
+    remove_derivatives(app.config["UPLOAD_FOLDER"], filename)
 
 
 def allowed_file(filename: str) -> bool:
@@ -169,7 +526,7 @@ def gconnect():
         response.headers["Content-Type"] = "application/json"
         return response
 
-    if result["issued_to"] != CLIENT_ID:
+    if result["issued_to"] != app.config["GOOGLE_CLIENT_ID"]:
         response = make_response(json.dumps("Token's client ID does not match app's."), 401)
         response.headers["Content-Type"] = "application/json"
         return response
@@ -206,7 +563,7 @@ def gconnect():
         <img src="{login_session['picture']}" class="profile-img-card" id="profile-img">
     """
     flash(f"You are now logged in as {login_session['username']}")
-    print("Logged in!")
+    app.logger.info("User %s logged in", user_id)
     return output
 
 
@@ -251,6 +608,7 @@ def createUser(login_session) -> int:
         picture=login_session["picture"],
     )
     session.add(new_user)
+    bump_catalog_version("user")
     session.commit()
     return new_user.id
 
@@ -268,7 +626,6 @@ def getUserID(email: str) -> Optional[int]:
     """
     try:
         user = session.query(User).filter_by(email=email).one()
-        print(f"user: {user}, type: {type(user)}")
         return user.id
     except NoResultFound:
         return None
@@ -277,85 +634,382 @@ def getUserID(email: str) -> Optional[int]:
 # ------------------------
 # API Endpoints - JSON and XML
 # ------------------------
+def page_args() -> Optional[tuple[int, int]]:
+    """
+    Parse ?limit= and ?cursor= from the query string (see paging.py).
+    """
+    return parse_page_args(request.args)
+
+
+def keyset_page(stmt, id_column, cursor: int, limit: int):
+    """
+    Fetch the rows of stmt with id_column > cursor, at most limit of them.
+    Returns (rows, next_cursor) where next_cursor is None on the last page.
+    """
+    rows = session.execute(page_select(stmt, id_column, cursor, limit)).all()
+    return split_page(rows, limit)
+
+
+def next_page_url(next_cursor: Optional[int], limit: int) -> Optional[str]:
+    """
+    Absolute URL of the next page of the current endpoint, or None.
+    Other query arguments, such as filters, are carried over.
+    """
+    if next_cursor is None:
+        return None
+    args = {**request.args.to_dict(flat=False), "limit": limit, "cursor": next_cursor}
+    return url_for(request.endpoint, **args, _external=True)
+
+
+def paged_response(response: Response, next_url: Optional[str]) -> Response:
+    """
+    Advertise the next page in a Link header as well as in the body.
+    """
+    if next_url:
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
+
+
+def bad_page_args() -> Response:
+    response = make_response(json.dumps("Invalid limit or cursor parameter."), 400)
+    response.headers["Content-Type"] = "application/json"
+    return response
+
+
+def bad_filter_args() -> Response:
+    response = make_response(json.dumps("Invalid filter parameter."), 400)
+    response.headers["Content-Type"] = "application/json"
+    return response
+
+
+def bad_batch_args() -> Response:
+    response = make_response(json.dumps(f"Send between 1 and {MAX_BATCH_IDS} integer ids."), 400)
+    response.headers["Content-Type"] = "application/json"
+    return response
+
+
+def bad_since_args() -> Response:
+    response = make_response(json.dumps("Invalid since or limit parameter."), 400)
+    response.headers["Content-Type"] = "application/json"
+    return response
+
+
+def json_response(payload) -> Response:
+    """
+    Encode payload with the fast serializer (orjson when installed).
+    """
+    return Response(dumps(payload), mimetype="application/json")
+
+
+def stream_json_array(key: str, projection: Projection, stmt) -> Response:
+    """
+    Stream the rows of stmt as {key: [...]} without holding the result in memory.
+    Rows are pulled STREAM_BATCH_SIZE at a time (server-side cursor where the
+    driver supports it) and each batch is encoded and sent as one chunk.
+    """
+    def generate():
+        yield b'{"%s":[' % key.encode()
+        result = session.execute(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+        sep = b""
+        for batch in result.partitions():
+            yield sep + projection.encode_rows(batch)
+            sep = b","
+        yield b"]}"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+def json_page(key: str, projection: Projection, id_column, cursor: int, limit: int) -> Response:
+    """
+    Return one keyset page of the projection as {key: [...], next_cursor, next}.
+    """
+    rows, next_cursor = keyset_page(projection.select(), id_column, cursor, limit)
+    next_url = next_page_url(next_cursor, limit)
+    response = json_response(
+        {key: projection.to_dicts(rows), "next_cursor": next_cursor, "next": next_url}
+    )
+    return paged_response(response, next_url)
+
+
+def stream_rows(stmt) -> Iterator:
+    """
+    Yield the rows of stmt, fetched STREAM_BATCH_SIZE at a time.
+    """
+    yield from session.execute(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+
+
+def chunked(pieces: Iterable[str]) -> Iterator[bytes]:
+    """
+    Join the many small strings of a template stream into chunks of about
+    STREAM_CHUNK_SIZE bytes, so each write to the client carries real data.
+    """
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= STREAM_CHUNK_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    yield "".join(buffer).encode("utf-8")
+
+
+def xml_list(template: str, rows_name: str, projection: Projection, id_column) -> Response:
+    """
+    Render template over one page with ?limit=&cursor=, otherwise over every
+    row. Either way the document is streamed as it renders, and a full export
+    holds only one batch of rows at a time.
+    """
+    try:
+        page = page_args()
+    except ValueError:
+        return bad_page_args()
+
+    next_url = None
+    if page is None:
+        rows = stream_rows(projection.select().order_by(id_column))
+    else:
+        rows, next_cursor = keyset_page(projection.select(), id_column, *page)
+        next_url = next_page_url(next_cursor, page[1])
+    body = stream_template(template, **{rows_name: rows, "next_url": next_url})
+    return paged_response(Response(chunked(body), mimetype="application/xml"), next_url)
+
+
 @app.route("/brands/JSON")
+@replica_reads
+@conditional("whiskey", "region")
 def allBrandsJSON():
-    """Return all brands of whiskey as JSON."""
-    brands = session.query(Whiskey).all()
-    return jsonify(AllBrands=[i.serialize for i in brands])
+    """
+    Return brands of whiskey as JSON.
+    With ?limit=&cursor= returns one page, otherwise streams them all.
+    """
+    try:
+        page = page_args()
+    except ValueError:
+        return bad_page_args()
+
+    if page is not None:
+        return json_page("AllBrands", WHISKEY_PROJECTION, Whiskey.id, *page)
+    stmt = WHISKEY_PROJECTION.select().order_by(Whiskey.id)
+    return stream_json_array("AllBrands", WHISKEY_PROJECTION, stmt)
 
 
 @app.route("/regions/JSON")
+@replica_reads
+@conditional("region")
 def allRegionsJSON():
-    """Return all regions as JSON."""
-    regions = session.query(Region).all()
-    return jsonify(AllRegions=[i.serialize for i in regions])
+    """
+    Return regions as JSON.
+    With ?limit=&cursor= returns one page, otherwise streams them all.
+    """
+    try:
+        page = page_args()
+    except ValueError:
+        return bad_page_args()
+
+    if page is not None:
+        return json_page("AllRegions", REGION_PROJECTION, Region.id, *page)
+    stmt = REGION_PROJECTION.select().order_by(Region.id)
+    return stream_json_array("AllRegions", REGION_PROJECTION, stmt)
+
+
+@app.route("/brands/filter/JSON")
+@replica_reads
+@conditional("whiskey", "region")
+def filterBrandsJSON():
+    """
+    Return one page of brands matching the ABV/proof ranges, regions, types
+    and manufacturers in the query string, with facet counts (see facets.py).
+    """
+    try:
+        filters = parse_filters(request.args.to_dict(flat=False))
+    except ValueError:
+        return bad_filter_args()
+    try:
+        cursor, limit = page_args() or (0, DEFAULT_PAGE_SIZE)
+    except ValueError:
+        return bad_page_args()
+
+    stmt = filtered_select(WHISKEY_PROJECTION.select(), filters)
+    rows, next_cursor = keyset_page(stmt, Whiskey.id, cursor, limit)
+    facets = facet_counts(session.execute(facet_select(filters)).all())
+    next_url = next_page_url(next_cursor, limit)
+    response = json_response({
+        "Brands": WHISKEY_PROJECTION.to_dicts(rows),
+        "facets": facets,
+        "next_cursor": next_cursor,
+        "next": next_url,
+    })
+    return paged_response(response, next_url)
+
+
+def json_batch(key: str, projection: Projection, id_column) -> Response:
+    """
+    Return the rows with the ids of the request as {key: [...]}, in request
+    order (see batch.py). Ids come from ?ids= or a POST body, either JSON
+    ({"ids": [...]} or a bare list) or form fields.
+    """
+    try:
+        if request.method != "POST":
+            ids = parse_ids(request.args.getlist("ids"))
+        elif request.is_json:
+            ids = ids_from_json(request.get_json(silent=True))
+        else:
+            ids = parse_ids(request.form.getlist("ids"))
+    except ValueError:
+        return bad_batch_args()
+
+    rows = session.execute(batch_select(projection, id_column, ids)).all()
+    return json_response({key: in_request_order(projection, ids, rows)})
+
+
+# Exempt from CSRF: a read-only API call that may send its ids as a POST body
+@csrf.exempt
+@app.route("/brands/batch", methods=["GET", "POST"])
+@replica_reads
+@conditional("whiskey", "region")
+def batchBrandsJSON():
+    """Return the brands with the given ids as JSON, in request order."""
+    return json_batch("Brands", WHISKEY_PROJECTION, Whiskey.id)
+
+
+@csrf.exempt
+@app.route("/regions/batch", methods=["GET", "POST"])
+@replica_reads
+@conditional("region")
+def batchRegionsJSON():
+    """Return the regions with the given ids as JSON, in request order."""
+    return json_batch("Regions", REGION_PROJECTION, Region.id)
+
+
+@app.route("/changes")
+@replica_reads
+@conditional(CHANGE_FEED)
+def showChanges():
+    """
+    Return the region and whiskey changes after ?since=, oldest first, at
+    most ?limit= of them (see changes.py). Without since, return no changes
+    and the current position of the feed.
+    """
+    try:
+        since, limit = parse_since(request.args)
+    except ValueError:
+        return bad_since_args()
+
+    if since is None:
+        current = session.execute(current_seq_select()).scalar_one()
+        return json_response({"changes": [], "since": current, "more": False})
+    results = [session.execute(stmt).all() for stmt in feed_selects(since, limit)]
+    return json_response(feed_page(results, since, limit))
 
 
 @app.route("/brands/<int:id>/JSON")
+@replica_reads
+@conditional("whiskey", "region")
 def singleBrandJSON(id: int):
     """Return single brand data as JSON."""
-    whiskey = session.query(Whiskey).filter_by(id=id).all()
-    return jsonify(WhiskeyInfo=[i.serialize for i in whiskey])
+    rows = session.execute(WHISKEY_PROJECTION.select().where(Whiskey.id == id)).all()
+    return json_response({"WhiskeyInfo": WHISKEY_PROJECTION.to_dicts(rows)})
 
 
 @app.route("/regions/<int:id>/JSON")
+@replica_reads
+@conditional("region")
 def singleRegionJSON(id: int):
     """Return single region data as JSON."""
-    region = session.query(Region).filter_by(id=id).all()
-    return jsonify(RegionInfo=[i.serialize for i in region])
+    rows = session.execute(REGION_PROJECTION.select().where(Region.id == id)).all()
+    return json_response({"RegionInfo": REGION_PROJECTION.to_dicts(rows)})
 
 
 @app.route("/brands/XML")
+@replica_reads
+@conditional("whiskey", "region")
 def allBrandsXML():
-    """Return all brands of whiskey as XML."""
-    brands = session.query(Whiskey).all()
-    brands_list = [i.serialize for i in brands]
-    xml_all_brands = render_template("all-brands.xml", brands_list=brands_list)
-    response = make_response(xml_all_brands)
-    response.headers["Content-Type"] = "application/xml"
-    return response
+    """
+    Return brands of whiskey as XML.
+    With ?limit=&cursor= returns one page, otherwise streams them all.
+    """
+    return xml_list("all-brands.xml", "brands_list", WHISKEY_PROJECTION, Whiskey.id)
 
 
 @app.route("/regions/XML")
+@replica_reads
+@conditional("region")
 def allRegionsXML():
-    """Return all regions as XML."""
-    regions = session.query(Region).all()
-    regions_list = [i.serialize for i in regions]
-    all_regions = render_template("all-regions.xml", regions_list=regions_list)
-    response = make_response(all_regions)
-    response.headers["Content-Type"] = "application/xml"
-    return response
+    """
+    Return regions as XML.
+    With ?limit=&cursor= returns one page, otherwise streams them all.
+    """
+    return xml_list("all-regions.xml", "regions_list", REGION_PROJECTION, Region.id)
 
 
 # ------------------------
 # Web page routes
 # ------------------------
+# Landing page aggregates are cached per worker for this many seconds, keyed
+# by the whiskey and user change stamps, so a write made by any worker or
+# import moves every worker onto fresh figures.
+LANDING_CACHE_TTL: Final[int] = int(os.environ.get("LANDING_CACHE_TTL", "300"))
+landing_cache = TTLCache(ttl=LANDING_CACHE_TTL, max_entries=8)
+
+
+def catalog_changed() -> None:
+    """
+    Called by the CRUD routes after committing a change to the catalog.
+    Cached entries are keyed by catalog version, so dropping them only frees
+    memory.
+    """
+    landing_cache.invalidate()
+    if app.jinja_env.fragment_cache is not None:
+        app.jinja_env.fragment_cache.invalidate()
+
+
+def landing_stats():
+    """
+    Compute the latest four whiskeys and the top four contributors by count.
+    Returns plain rows so they can outlive the request's session.
+    """
+    latest = session.execute(
+        select(Whiskey.name, Whiskey.manufacturer)
+        .order_by(desc(Whiskey.date_added))
+        .limit(4)
+    ).all()
+
+    whiskey_count = func.count(Whiskey.id).label("whiskey_count")
+    top_users = session.execute(
+        select(whiskey_count, User.name, User.picture)
+        .join(User, Whiskey.user_id == User.id)
+        .group_by(User.id)
+        .order_by(desc(whiskey_count))
+        .limit(4)
+    ).all()
+
+    return latest, top_users
+
+
 @app.route("/")
 @app.route("/index")
+@replica_reads
+@conditional("whiskey", "user", private=True)
 def showApp():
     """
     Returns landing page of app with the top users and latest whiskies added.
     """
-    lastest_whiskey_added = session.query(Whiskey).order_by(desc(Whiskey.date_added)).limit(4)
-
-    # Query top whiskey creators by count
-    q = (
-        session.query(func.count(Whiskey.user_id), User)
-        .filter(Whiskey.user_id == User.id)
-        .group_by(Whiskey.user_id)
-        .limit(4)
+    lastest_whiskey_added, top_users = landing_cache.get_or_set(
+        ("landing", catalog_version("whiskey", "user")), landing_stats
     )
-    sorted_query = sorted(q, key=itemgetter(0), reverse=True)
 
     return render_template(
         "index.html",
         lastest_whiskey_added=lastest_whiskey_added,
-        q=sorted_query,
+        q=top_users,
         flask_token="token",
     )
 
 
 @app.route("/regions")
+@replica_reads
+@conditional("region", private=True)
 def showRegions():
     """
     Display all regions sorted alphabetically.
@@ -365,34 +1019,30 @@ def showRegions():
 
 
 @app.route("/regions/<string:region>")
+@replica_reads
+@conditional("region", "whiskey", "user", private=True)
 def single_region(region: str):
     """
     Show whiskies for a given region name.
+    The whiskeys and their creators are loaded in one query, and only when
+    the page's cached fragment is missing or stale.
     """
-    brands_in_region = session.query(Whiskey).filter_by(region=region).all()
-    region_query = session.query(Region.name).filter_by(name=region).all()
-
-    name = "null"
-    for i in region_query:
-        name = i.name
-
-    if name == region:
-        # Add HTML snippet to each whiskey for display
-        for i in brands_in_region:
-            user = session.query(User).filter_by(id=i.user_id).one()
-            para_el = (
-                '<p><span>Created By: %s </span>  <img src="%s"'
-                ' class="img-circle" height="32" width="32"/></p>'
-                % (user.name, user.picture)
-            )
-            i.p = para_el
-
-        return render_template("showRegion.html", brands_query=brands_in_region, region=region)
-    else:
+    region_id = session.scalar(select(Region.id).where(Region.name == region))
+    if region_id is None:
         return render_template("404.html")
 
+    whiskeys = (
+        session.query(Whiskey)
+        .options(joinedload(Whiskey.user))
+        .filter(Whiskey.region_id == region_id)
+        .order_by(Whiskey.id)
+    )
+    return render_template("showRegion.html", brands_query=whiskeys, region=region)
+
 
 @app.route("/brands")
+@replica_reads
+@conditional("whiskey", private=True)
 def showBrands():
     """
     List all whiskey brand names alphabetically.
@@ -402,6 +1052,8 @@ def showBrands():
 
 
 @app.route("/brands/<string:brand>")
+@replica_reads
+@conditional("whiskey", "region", "user", private=True)
 def singleBrand(brand: str):
     """
     Show details for a single whiskey brand by name.
@@ -426,9 +1078,56 @@ def singleBrand(brand: str):
         return render_template("404.html")
 
 
+# Results returned by /search unless ?limit= asks for fewer or more
+DEFAULT_SEARCH_LIMIT: Final[int] = 50
+
+
+def search_args() -> tuple[str, int]:
+    """
+    Read ?q= and ?limit= for the search routes.
+    """
+    q = request.args.get("q", "").strip()
+    limit = request.args.get("limit", DEFAULT_SEARCH_LIMIT, type=int)
+    return q, max(1, min(limit, MAX_PAGE_SIZE))
+
+
+@app.route("/search")
+@replica_reads
+@conditional("whiskey", "region", private=True)
+def search():
+    """
+    Full-text search over whiskey name, manufacturer, type and description.
+    """
+    q, limit = search_args()
+    results = search_whiskeys(session, q, limit)
+    return render_template("search.html", search_query=q, results=results)
+
+
+@app.route("/search/JSON")
+@replica_reads
+@conditional("whiskey", "region")
+def searchJSON():
+    """Return full-text search results as JSON, best match first."""
+    q, limit = search_args()
+    rows = search_whiskeys(session, q, limit)
+    return json_response({"Results": WHISKEY_PROJECTION.to_dicts(rows)})
+
+
 # ------------------------
 # Whiskey CRUD routes
 # ------------------------
+ABV_ERROR: Final[str] = "ABV must be a number between 0 and 100."
+
+
+def form_abv(value: str) -> Optional[float]:
+    """
+    ABV entered in a whiskey form, or None unless it is a number in (0, 100].
+    """
+    abv = parse_strength(value)
+    if abv is None or not 0 < abv <= 100:
+        return None
+    return abv
+
 
 @app.route("/whiskey/new", methods=["GET", "POST"])
 @login_required
@@ -448,7 +1147,7 @@ def newWhiskey():
     type = request.form["type"].strip()
     manufac = request.form["manufacturer"].strip()
     abv = request.form["abv"].strip()
-    region = request.form.get("region", "")
+    region = session.query(Region).filter_by(name=request.form.get("region", "")).one_or_none()
     file = request.files.get("file")
 
     if (
@@ -464,9 +1163,13 @@ def newWhiskey():
         e = "Please enter all the fields."
         return render_template("new-whiskey.html", all_regions=all_regions, e=e)
 
+    abv = form_abv(abv)
+    if abv is None:
+        e = ABV_ERROR
+        return render_template("new-whiskey.html", all_regions=all_regions, e=e)
+
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        file.save(os.path.join(app.config["UPLOAD_FOLDER"], filename))
+        filename, size = save_upload(file)
 
         newWhiskey = Whiskey(
             name=name,
@@ -479,7 +1182,11 @@ def newWhiskey():
             user_id=login_session["user_id"],
         )
         session.add(newWhiskey)
+        record_changes(newWhiskey)
+        add_ref(session, filename, size)
+        bump_catalog_version("whiskey")
         session.commit()
+        catalog_changed()
         flash(f"New Whiskey {newWhiskey.name} Successfully Added")
         return redirect(url_for("showApp"))
     else:
@@ -506,7 +1213,13 @@ def editWhiskey(id: int):
     if request.method == "POST":
         file = request.files.get("file")
         filename: Optional[str] = file.filename if file else None
-        regionId = request.form["region"]
+        unreferenced_img: Optional[str] = None
+
+        abv = form_abv(request.form["abv"]) if request.form["abv"] else None
+        if request.form["abv"] and abv is None:
+            return render_template(
+                "edit-whiskey.html", brand=editedWhiskey, all_regions=all_regions, e=ABV_ERROR
+            )
 
         if request.form["name"]:
             editedWhiskey.name = request.form["name"]
@@ -515,16 +1228,12 @@ def editWhiskey(id: int):
             editedWhiskey.description = request.form["description"]
 
         if file and filename and allowed_file(filename):
-            safe_filename = secure_filename(filename)
-
-            if oldimg_name:
-                try:
-                    os.remove(os.path.join(UPLOAD_FOLDER, oldimg_name))
-                except FileNotFoundError:
-                    print(f"Old image {oldimg_name} not found for deletion.")
+            stored_name, size = save_upload(file)
+            editedWhiskey.img_name = stored_name
+            add_ref(session, stored_name, size)
 
-            file.save(os.path.join(app.config["UPLOAD_FOLDER"], safe_filename))
-            editedWhiskey.img_name = safe_filename
+            if oldimg_name and release(session, oldimg_name):
+                unreferenced_img = oldimg_name
 
         if request.form["type"]:
             editedWhiskey.type = request.form["type"]
@@ -532,16 +1241,22 @@ def editWhiskey(id: int):
         if request.form["manufacturer"]:
             editedWhiskey.manufacturer = request.form["manufacturer"]
 
-        if request.form["abv"]:
-            editedWhiskey.abv = request.form["abv"]
+        if abv is not None:
+            editedWhiskey.abv = abv
+            editedWhiskey.proof = abv * 2
 
         if request.form["region"]:
-            region_obj = session.query(Region).filter_by(id=int(regionId)).one_or_none()
+            region_obj = session.query(Region).filter_by(name=request.form["region"]).one_or_none()
             if region_obj:
                 editedWhiskey.region = region_obj
 
         flash(f"{editedWhiskey.name} successfully edited.")
+        record_changes(editedWhiskey)
+        bump_catalog_version("whiskey")
         session.commit()
+        catalog_changed()
+        if unreferenced_img:
+            remove_upload(unreferenced_img)
         return redirect(url_for("showApp"))
 
     else:
@@ -563,16 +1278,19 @@ def deleteWhiskey(id: int):
         return redirect(url_for("showApp"))
 
     if request.method == "POST":
+        # The row is gone after commit, so read what the flash needs now
+        name = whiskeyToDelete.name
         session.query(Whiskey).filter(Whiskey.id == whiskeyToDelete.id).delete(synchronize_session=False)
-        whiskey_img = cast(str, whiskeyToDelete.img_name)
-
-        try:
-            os.remove(os.path.join(UPLOAD_FOLDER, whiskey_img))
-        except FileNotFoundError:
-            print(f"Image {whiskey_img} not found for deletion.")
+        record_delete("whiskey", whiskeyToDelete.id)
+        whiskey_img = whiskeyToDelete.img_name
+        unreferenced = bool(whiskey_img) and release(session, whiskey_img)
 
+        bump_catalog_version("whiskey")
         session.commit()
-        flash(f"{whiskeyToDelete.name} Successfully Deleted")
+        catalog_changed()
+        if unreferenced:
+            remove_upload(whiskey_img)
+        flash(f"{name} Successfully Deleted")
         return redirect(url_for("showApp"))
 
     else:
@@ -604,6 +1322,14 @@ def disconnect():
         return redirect(url_for("showRegions"))
 
 
+@app.route("/metrics")
+def showMetrics():
+    """
+    Per-route request, SQL and timing counters in the Prometheus text format.
+    """
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.errorhandler(404)
 def handle_404(e):
     return render_template("404.html"), 404
@@ -615,9 +1341,50 @@ def handle_500(e):
 
 
 # ------------------------
-# Main app run
+# App factory
+# ------------------------
+def load_client_id(path: str = CLIENT_SECRET_PATH) -> Optional[str]:
+    """
+    Google OAuth client ID from client_secret.json, or None (Google sign-in
+    disabled) when the file is missing.
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f)["web"]["client_id"]
+    except FileNotFoundError:
+        app.logger.warning("%s not found; Google sign-in is disabled", path)
+        return None
+
+
+def create_app(create_tables: bool = True) -> Flask:
+    """
+    Finish setting up the app and return it. Call once per process, before
+    serving or forking workers (see wsgi.py).
+    create_tables creates missing tables, the search index and the catalog
+    change stamps; turn it off when db_migrate.py has already run.
+    """
+    app.config["GOOGLE_CLIENT_ID"] = load_client_id()
+    if os.environ.get("SECRET_KEY"):
+        app.secret_key = os.environ["SECRET_KEY"]
+
+    if create_tables:
+        Base.metadata.create_all(engine)
+        ensure_search_index(engine)
+        ensure_catalog_versions(engine)
+
+    # Build mapper configuration and compile every template now, so forked
+    # workers inherit them instead of each doing it on its first requests
+    configure_mappers()
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    return app
+
+
+# ------------------------
+# Main app run (development server)
 # ------------------------
 if __name__ == "__main__":
-    app.secret_key = "super_secret_key"
+    create_app()
+    app.secret_key = app.secret_key or "super_secret_key"
     app.debug = True
     app.run(host="localhost", use_reloader=True, port=8000, threaded=True)
\ No newline at end of file
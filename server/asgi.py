@@ -0,0 +1,542 @@
+"""
+asgi.py: The read-only JSON and XML API as an asyncio ASGI application.
+
+Serves the same URLs, payloads, paging and conditional-GET headers as the
+API routes of app.py, on SQLAlchemy's asyncio engine: a request waiting on
+the database holds a coroutine instead of a thread, so one process keeps
+thousands of API clients connected. Pages, logins and edits stay in the
+Flask app; send the API paths to this process at the proxy.
+
+    pip install aiosqlite uvicorn        # asyncpg instead of aiosqlite for PostgreSQL
+    cd server && uvicorn asgi:app --port 8001
+
+The process only reads, so DATABASE_URL may point it at a replica. It also
+serves /events, the live Server-Sent Events stream of catalog changes.
+"""
+import asyncio
+import email.utils
+import json
+import os
+import re
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Union
+from urllib.parse import parse_qs, parse_qsl, urlencode
+
+from batch import MAX_BATCH_IDS, batch_select, ids_from_json, in_request_order, parse_ids
+from changes import current_seq_select, feed_page, feed_selects, parse_since
+from db_engine import make_async_engine
+from db_models import CHANGE_FEED, CatalogVersion, Region, Whiskey, catalog_validators
+from events import (
+    DEFAULT_POLL_SECONDS,
+    DEFAULT_QUEUE_SIZE,
+    KEEPALIVE_SECONDS,
+    RETRY_MS,
+    Broadcaster,
+    Subscription,
+    sse_message,
+)
+from facets import facet_counts, facet_select, filtered_select, parse_filters
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from paging import (
+    DEFAULT_PAGE_SIZE,
+    STREAM_BATCH_SIZE,
+    STREAM_CHUNK_SIZE,
+    page_select,
+    parse_page_args,
+    split_page,
+)
+from serializers import REGION_PROJECTION, WHISKEY_PROJECTION, Projection, dumps
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+engine = make_async_engine()
+
+broadcaster = Broadcaster(
+    engine,
+    poll_seconds=float(os.environ.get("EVENTS_POLL_SECONDS", DEFAULT_POLL_SECONDS)),
+    queue_size=int(os.environ.get("EVENTS_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)),
+)
+
+# The Flask app's XML templates, rendered while rows stream in
+templates = Environment(
+    loader=FileSystemLoader(os.path.join(BASE_DIR, "templates")),
+    autoescape=select_autoescape(["html", "xml"]),
+    enable_async=True,
+)
+
+
+# ------------------------
+# Requests and responses
+# ------------------------
+class Request:
+    """
+    The parts of an ASGI HTTP scope the API reads.
+    """
+
+    def __init__(self, scope: dict, receive: Callable[[], Awaitable[dict]]):
+        self.receive = receive
+        self.method = scope["method"]
+        self.path = scope["path"]
+        query = scope["query_string"].decode("latin-1")
+        self.args = dict(parse_qsl(query))
+        self.multi_args = parse_qs(query)
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        host = self.headers.get("host") or "%s:%s" % tuple(scope.get("server") or ("localhost", 80))
+        self.base_url = f"{scope.get('scheme', 'http')}://{host}{scope.get('root_path', '')}"
+
+    async def body(self) -> bytes:
+        """
+        Read the whole request body.
+        """
+        chunks = []
+        while True:
+            message = await self.receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def disconnected(self) -> None:
+        """
+        Return once the client has gone away.
+        """
+        while (await self.receive())["type"] != "http.disconnect":
+            pass
+
+
+Body = Union[bytes, AsyncIterator[Union[bytes, str]]]
+
+
+class Response:
+    """
+    Status, headers and a body that is either bytes or an async iterator of
+    bytes/str chunks. Chunks are sent once chunk_size bytes have built up;
+    0 sends each as it comes.
+    """
+
+    def __init__(self, body: Body = b"", status: int = 200,
+                 content_type: str = "application/json", headers: Optional[dict] = None,
+                 chunk_size: int = STREAM_CHUNK_SIZE):
+        self.body = body
+        self.status = status
+        self.chunk_size = chunk_size
+        self.headers = {"Content-Type": content_type, **(headers or {})}
+
+    async def send(self, send: Callable[[dict], Awaitable[None]], head: bool = False) -> None:
+        headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in self.headers.items()]
+        if isinstance(self.body, bytes):
+            headers.append((b"content-length", str(len(self.body)).encode()))
+        await send({"type": "http.response.start", "status": self.status, "headers": headers})
+
+        if head or isinstance(self.body, bytes):
+            await send({"type": "http.response.body", "body": b"" if head else self.body})
+            return
+
+        buffer = []
+        size = 0
+        async for chunk in self.body:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= self.chunk_size:
+                await send({"type": "http.response.body", "body": b"".join(buffer), "more_body": True})
+                buffer, size = [], 0
+        await send({"type": "http.response.body", "body": b"".join(buffer)})
+
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    return Response(dumps(payload), status)
+
+
+def bad_page_args() -> Response:
+    return Response(json.dumps("Invalid limit or cursor parameter.").encode(), 400)
+
+
+def bad_filter_args() -> Response:
+    return Response(json.dumps("Invalid filter parameter.").encode(), 400)
+
+
+def bad_since_args() -> Response:
+    return Response(json.dumps("Invalid since or limit parameter.").encode(), 400)
+
+
+def bad_batch_args() -> Response:
+    return Response(json.dumps(f"Send between 1 and {MAX_BATCH_IDS} integer ids.").encode(), 400)
+
+
+def next_page_url(request: Request, next_cursor: Optional[int], limit: int) -> Optional[str]:
+    """
+    Absolute URL of the next page of the current endpoint, or None.
+    Other query arguments, such as filters, are carried over.
+    """
+    if next_cursor is None:
+        return None
+    args = {**request.multi_args, "limit": limit, "cursor": next_cursor}
+    return f"{request.base_url}{request.path}?{urlencode(args, doseq=True)}"
+
+
+def paged(response: Response, next_url: Optional[str]) -> Response:
+    """
+    Advertise the next page in a Link header as well as in the body.
+    """
+    if next_url:
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
+
+
+# ------------------------
+# Conditional GETs
+# ------------------------
+async def validators(conn: AsyncConnection, entities: tuple[str, ...]):
+    """
+    (ETag, Last-Modified) from the change stamps of entities, as app.py
+    computes them, so either process answers a revalidation.
+    """
+    stamps = (await conn.execute(
+        select(CatalogVersion.entity, CatalogVersion.version, CatalogVersion.updated_at)
+        .where(CatalogVersion.entity.in_(entities))
+        .order_by(CatalogVersion.entity)
+    )).all()
+    return catalog_validators(stamps)
+
+
+def not_modified(request: Request, etag: str, last_modified) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {t.strip().strip('"') for t in if_none_match.split(",") if not t.strip().startswith("W/")}
+        return etag in tags or "*" in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return email.utils.parsedate_to_datetime(if_modified_since) >= last_modified
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+# ------------------------
+# Routing
+# ------------------------
+Handler = Callable[..., Awaitable[Response]]
+ROUTES: list[tuple[re.Pattern, tuple[str, ...], tuple[str, ...], Handler]] = []
+
+
+def route(pattern: str, *entities: str, methods: tuple[str, ...] = ("GET",)):
+    """
+    Register a handler for pattern (a regex whose named groups become int
+    arguments) whose output depends only on the given entities. GET routes
+    also answer HEAD; only GET and HEAD are revalidated, and only successful
+    responses carry the validators.
+    """
+    if "GET" in methods:
+        methods += ("HEAD",)
+
+    def decorator(f: Handler) -> Handler:
+        ROUTES.append((re.compile(f"^{pattern}$"), entities, methods, f))
+        return f
+    return decorator
+
+
+async def dispatch(request: Request, conn: AsyncConnection) -> Response:
+    for pattern, entities, methods, handler in ROUTES:
+        match = pattern.match(request.path)
+        if match is None:
+            continue
+        if request.method not in methods:
+            return json_response("Method not allowed.", 405)
+        args = {k: int(v) for k, v in match.groupdict().items()}
+        if request.method not in ("GET", "HEAD"):
+            return await handler(request, conn, **args)
+
+        etag, last_modified = await validators(conn, entities)
+        if not_modified(request, etag, last_modified):
+            response = Response(b"", 304)
+        else:
+            response = await handler(request, conn, **args)
+            if not 200 <= response.status < 300:
+                return response
+        response.headers["ETag"] = f'"{etag}"'
+        if last_modified is not None:
+            response.headers["Last-Modified"] = email.utils.format_datetime(last_modified, usegmt=True)
+        response.headers["Cache-Control"] = "no-cache, public"
+        return response
+    return json_response("Not found.", 404)
+
+
+async def app(scope: dict, receive, send) -> None:
+    """
+    ASGI entry point.
+    """
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] != "http":
+        return
+
+    request = Request(scope, receive)
+    if request.path == "/events":
+        # Open for as long as the client stays, so it must not hold a pooled connection
+        response = await events(request)
+        await response.send(send, head=request.method == "HEAD")
+        return
+
+    # The connection stays checked out until a streamed body is fully sent
+    async with engine.connect() as conn:
+        response = await dispatch(request, conn)
+        await response.send(send, head=request.method == "HEAD")
+
+
+# ------------------------
+# Helpers for the API endpoints
+# ------------------------
+async def stream_rows(conn: AsyncConnection, stmt) -> AsyncIterator:
+    """
+    Yield the rows of stmt, fetched STREAM_BATCH_SIZE at a time.
+    """
+    result = await conn.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+    async for row in result:
+        yield row
+
+
+async def stream_json_array(conn: AsyncConnection, key: str, projection: Projection,
+                            stmt) -> AsyncIterator[bytes]:
+    """
+    Encode the rows of stmt as {key: [...]}, one batch per chunk.
+    """
+    yield b'{"%s":[' % key.encode()
+    result = await conn.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+    sep = b""
+    async for batch in result.partitions():
+        yield sep + projection.encode_rows(batch)
+        sep = b","
+    yield b"]}"
+
+
+async def keyset_page(conn: AsyncConnection, projection: Projection, id_column,
+                      cursor: int, limit: int):
+    """
+    One keyset page of the projection. Returns (rows, next_cursor).
+    """
+    rows = (await conn.execute(page_select(projection.select(), id_column, cursor, limit))).all()
+    return split_page(rows, limit)
+
+
+async def json_batch(request: Request, conn: AsyncConnection, key: str,
+                     projection: Projection, id_column) -> Response:
+    """
+    The rows with the ids of ?ids= or a POST body, in request order.
+    """
+    try:
+        if request.method != "POST":
+            ids = parse_ids(request.multi_args.get("ids", []))
+        elif request.headers.get("content-type", "").startswith("application/json"):
+            ids = ids_from_json(json.loads(await request.body() or b"null"))
+        else:
+            ids = parse_ids(parse_qs((await request.body()).decode("latin-1")).get("ids", []))
+    except ValueError:
+        return bad_batch_args()
+
+    rows = (await conn.execute(batch_select(projection, id_column, ids))).all()
+    return json_response({key: in_request_order(projection, ids, rows)})
+
+
+async def json_list(request: Request, conn: AsyncConnection, key: str,
+                    projection: Projection, id_column) -> Response:
+    """
+    One page with ?limit=&cursor=, otherwise every row streamed.
+    """
+    try:
+        page = parse_page_args(request.args)
+    except ValueError:
+        return bad_page_args()
+
+    if page is None:
+        stmt = projection.select().order_by(id_column)
+        return Response(stream_json_array(conn, key, projection, stmt))
+
+    rows, next_cursor = await keyset_page(conn, projection, id_column, *page)
+    next_url = next_page_url(request, next_cursor, page[1])
+    return paged(
+        json_response({key: projection.to_dicts(rows), "next_cursor": next_cursor, "next": next_url}),
+        next_url,
+    )
+
+
+async def xml_list(request: Request, conn: AsyncConnection, template: str, rows_name: str,
+                   projection: Projection, id_column) -> Response:
+    """
+    Render template over one page with ?limit=&cursor=, otherwise over every
+    row, streaming the document as rows arrive.
+    """
+    try:
+        page = parse_page_args(request.args)
+    except ValueError:
+        return bad_page_args()
+
+    next_url = None
+    if page is None:
+        rows = stream_rows(conn, projection.select().order_by(id_column))
+    else:
+        rows, next_cursor = await keyset_page(conn, projection, id_column, *page)
+        next_url = next_page_url(request, next_cursor, page[1])
+    body = templates.get_template(template).generate_async(**{rows_name: rows, "next_url": next_url})
+    return paged(Response(body, content_type="application/xml"), next_url)
+
+
+# ------------------------
+# API Endpoints - JSON and XML
+# ------------------------
+@route("/brands/JSON", "whiskey", "region")
+async def all_brands_json(request, conn):
+    return await json_list(request, conn, "AllBrands", WHISKEY_PROJECTION, Whiskey.id)
+
+
+@route("/regions/JSON", "region")
+async def all_regions_json(request, conn):
+    return await json_list(request, conn, "AllRegions", REGION_PROJECTION, Region.id)
+
+
+@route("/brands/filter/JSON", "whiskey", "region")
+async def filter_brands_json(request, conn):
+    try:
+        filters = parse_filters(request.multi_args)
+    except ValueError:
+        return bad_filter_args()
+    try:
+        cursor, limit = parse_page_args(request.args) or (0, DEFAULT_PAGE_SIZE)
+    except ValueError:
+        return bad_page_args()
+
+    stmt = filtered_select(WHISKEY_PROJECTION.select(), filters)
+    rows = (await conn.execute(page_select(stmt, Whiskey.id, cursor, limit))).all()
+    rows, next_cursor = split_page(rows, limit)
+    facets = facet_counts((await conn.execute(facet_select(filters))).all())
+    next_url = next_page_url(request, next_cursor, limit)
+    return paged(
+        json_response({
+            "Brands": WHISKEY_PROJECTION.to_dicts(rows),
+            "facets": facets,
+            "next_cursor": next_cursor,
+            "next": next_url,
+        }),
+        next_url,
+    )
+
+
+@route("/brands/batch", "whiskey", "region", methods=("GET", "POST"))
+async def batch_brands_json(request, conn):
+    return await json_batch(request, conn, "Brands", WHISKEY_PROJECTION, Whiskey.id)
+
+
+@route("/regions/batch", "region", methods=("GET", "POST"))
+async def batch_regions_json(request, conn):
+    return await json_batch(request, conn, "Regions", REGION_PROJECTION, Region.id)
+
+
+@route("/changes", CHANGE_FEED)
+async def changes(request, conn):
+    try:
+        since, limit = parse_since(request.args)
+    except ValueError:
+        return bad_since_args()
+
+    if since is None:
+        current = (await conn.execute(current_seq_select())).scalar_one()
+        return json_response({"changes": [], "since": current, "more": False})
+    results = [(await conn.execute(stmt)).all() for stmt in feed_selects(since, limit)]
+    return json_response(feed_page(results, since, limit))
+
+
+@route(r"/brands/(?P<id>\d+)/JSON", "whiskey", "region")
+async def single_brand_json(request, conn, id: int):
+    rows = (await conn.execute(WHISKEY_PROJECTION.select().where(Whiskey.id == id))).all()
+    return json_response({"WhiskeyInfo": WHISKEY_PROJECTION.to_dicts(rows)})
+
+
+@route(r"/regions/(?P<id>\d+)/JSON", "region")
+async def single_region_json(request, conn, id: int):
+    rows = (await conn.execute(REGION_PROJECTION.select().where(Region.id == id))).all()
+    return json_response({"RegionInfo": REGION_PROJECTION.to_dicts(rows)})
+
+
+@route("/brands/XML", "whiskey", "region")
+async def all_brands_xml(request, conn):
+    return await xml_list(request, conn, "all-brands.xml", "brands_list", WHISKEY_PROJECTION, Whiskey.id)
+
+
+@route("/regions/XML", "region")
+async def all_regions_xml(request, conn):
+    return await xml_list(request, conn, "all-regions.xml", "regions_list", REGION_PROJECTION, Region.id)
+
+
+# ------------------------
+# Live events
+# ------------------------
+async def event_messages(request: Request, subscription: Subscription,
+                         since: Optional[int]) -> AsyncIterator[bytes]:
+    """
+    The changes after since from the feed, then live changes as they are
+    published, until the client leaves or the subscription is dropped.
+    """
+    disconnected = asyncio.ensure_future(request.disconnected())
+    try:
+        yield b"retry: %d\n\n" % RETRY_MS
+        if since is not None:
+            async for change in broadcaster.changes_after(since):
+                yield sse_message(change)
+                since = change["seq"]
+
+        while True:
+            get = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait(
+                (get, disconnected), timeout=KEEPALIVE_SECONDS, return_when=asyncio.FIRST_COMPLETED,
+            )
+            if get not in done:
+                get.cancel()
+                if disconnected in done:
+                    return
+                yield b": keep-alive\n\n"
+                continue
+            change = get.result()
+            if change is None:
+                return
+            # Skip what the catch-up above already sent
+            if since is None or change["seq"] > since:
+                yield sse_message(change)
+    finally:
+        disconnected.cancel()
+        broadcaster.unsubscribe(subscription)
+
+
+async def events(request: Request) -> Response:
+    """
+    Server-Sent Events stream of catalog changes, one event per /changes
+    entry. Resumes after Last-Event-ID, or ?since= on a first connect.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return json_response("Method not allowed.", 405)
+    try:
+        last_event_id = request.headers.get("last-event-id") or request.args.get("since")
+        since = int(last_event_id) if last_event_id else None
+        if since is not None and since < 0:
+            raise ValueError
+    except ValueError:
+        return bad_since_args()
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if request.method == "HEAD":
+        return Response(b"", content_type="text/event-stream", headers=headers)
+    subscription = await broadcaster.subscribe()
+    return Response(
+        event_messages(request, subscription, since),
+        content_type="text/event-stream", headers=headers, chunk_size=0,
+    )
@@ -0,0 +1,65 @@
+"""
+batch.py: Multi-get by id for the JSON API, shared by the Flask app and
+the async API.
+
+    /brands/batch?ids=3,1,7
+    POST /brands/batch   {"ids": [3, 1, 7]}
+
+All ids are resolved with one IN query. Results come back in the order the
+ids were asked for, repeats included, and an id with no row is answered with
+{"id": ..., "not_found": true} in its place.
+"""
+from typing import Any, Final, Iterable, Sequence
+
+from serializers import Projection
+from sqlalchemy import Select
+
+# Most ids accepted in one request
+MAX_BATCH_IDS: Final[int] = 1000
+
+
+def parse_ids(values: Iterable[Any]) -> list[int]:
+    """
+    Ids from query values ("3,1,7" or repeated ids=) or a JSON list.
+    Raises ValueError on a non-integer id, an empty list or more than
+    MAX_BATCH_IDS ids.
+    """
+    ids = []
+    for value in values:
+        if isinstance(value, str):
+            ids.extend(int(v) for v in value.split(",") if v.strip())
+        elif isinstance(value, int) and not isinstance(value, bool):
+            ids.append(value)
+        else:
+            raise ValueError(f"invalid id {value!r}")
+    if not ids or len(ids) > MAX_BATCH_IDS:
+        raise ValueError(f"between 1 and {MAX_BATCH_IDS} ids are required")
+    return ids
+
+
+def ids_from_json(payload: Any) -> list[int]:
+    """
+    Ids from a JSON body, either {"ids": [...]} or a bare list.
+    Raises ValueError like parse_ids().
+    """
+    if isinstance(payload, dict):
+        payload = payload.get("ids")
+    if not isinstance(payload, list):
+        raise ValueError("expected a list of ids")
+    return parse_ids(payload)
+
+
+def batch_select(projection: Projection, id_column, ids: Sequence[int]) -> Select:
+    """
+    SELECT the projection's rows for ids in a single IN query.
+    """
+    return projection.select().where(id_column.in_(set(ids)))
+
+
+def in_request_order(projection: Projection, ids: Sequence[int], rows: Iterable[Sequence]) -> list[dict]:
+    """
+    The rows of a batch_select() as dicts, one per requested id in order,
+    with a not-found marker for ids that matched no row.
+    """
+    found = {row["id"]: row for row in projection.to_dicts(rows)}
+    return [found.get(id_, {"id": id_, "not_found": True}) for id_ in ids]
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+bench_indexes.py: Show the query plans and timings of the hot lookups in
+app.py on a large synthetic catalog, before and after db_migrate.py adds
+the indexes declared in db_models.py.
+
+Usage:
+    python bench_indexes.py --rows 1000000
+"""
+import argparse
+import datetime
+import os
+import tempfile
+import time
+
+from db_engine import make_engine
+from db_migrate import upgrade_indexes
+from db_models import Base
+from sqlalchemy import insert, inspect, text
+
+# (label, SQL, params) for the queries the routes in app.py issue
+HOT_QUERIES = [
+    ("singleBrand", "SELECT * FROM whiskey WHERE name = :name", {"name": "Whiskey 500000"}),
+    ("showBrands", "SELECT name FROM whiskey ORDER BY name LIMIT 50", {}),
+    ("single_region", "SELECT id FROM region WHERE name = :name", {"name": "Region 42"}),
+    ("single_region whiskeys", "SELECT * FROM whiskey WHERE region_id = :rid ORDER BY name", {"rid": 42}),
+    ("getUserID", "SELECT id FROM user WHERE email = :email", {"email": "user999@example.com"}),
+    ("showApp latest", "SELECT * FROM whiskey ORDER BY date_added DESC LIMIT 4", {}),
+    ("showApp top users", "SELECT user_id, count(*) FROM whiskey GROUP BY user_id", {}),
+]
+
+
+# ---------------------------------
+# Build an unindexed catalog of the requested size
+# ---------------------------------
+def build_catalog(engine, rows: int, batch: int = 50_000):
+    """
+    Create the schema without secondary indexes and bulk insert rows whiskeys
+    spread over 1000 users and 100 regions.
+    """
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for ix in inspect(conn).get_indexes(table.name):
+                conn.execute(text(f"DROP INDEX {ix['name']}"))
+
+    user = Base.metadata.tables["user"]
+    region = Base.metadata.tables["region"]
+    whiskey = Base.metadata.tables["whiskey"]
+    start = datetime.datetime(2000, 1, 1)
+
+    with engine.begin() as conn:
+        conn.execute(insert(user), [
+            {"id": i, "name": f"User {i}", "email": f"user{i}@example.com"}
+            for i in range(1, 1001)
+        ])
+        conn.execute(insert(region), [
+            {"id": i, "name": f"Region {i}", "user_id": i} for i in range(1, 101)
+        ])
+        for offset in range(0, rows, batch):
+            conn.execute(insert(whiskey), [
+                {
+                    "name": f"Whiskey {i}",
+                    "type": "Bourbon",
+                    "manufacturer": f"Distillery {i % 5000}",
+                    "abv": 40.0,
+                    "date_added": start + datetime.timedelta(minutes=i),
+                    "region_id": i % 100 + 1,
+                    "user_id": i % 1000 + 1,
+                }
+                for i in range(offset, min(offset + batch, rows))
+            ])
+
+
+# ---------------------------------
+# Plan and time each hot query
+# ---------------------------------
+def report(engine, heading: str):
+    print(f"\n== {heading} ==")
+    with engine.connect() as conn:
+        for label, sql, params in HOT_QUERIES:
+            plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params).all()
+            start = time.perf_counter()
+            conn.execute(text(sql), params).all()
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{label:<24} {elapsed:>9.2f} ms  " + " | ".join(row[-1] for row in plan))
+
+
+# -----------------------
+# Entry point for script
+# -----------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = make_engine(f"sqlite:///{path}")
+    try:
+        build_catalog(engine, args.rows)
+        report(engine, f"{args.rows} whiskeys, no indexes")
+        upgrade_indexes(engine)
+        # Measure on fresh connections, as a restarted app would see them
+        engine.dispose()
+        report(engine, f"{args.rows} whiskeys, after db_migrate")
+    finally:
+        engine.dispose()
+        os.remove(path)
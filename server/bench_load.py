@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+bench_load.py: Hammer the read endpoints of app.py from N threads against a
+real threaded WSGI server and report requests/sec per endpoint.
+
+Usage:
+    python bench_load.py --threads 8 --requests 200
+"""
+import argparse
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import List
+
+from werkzeug.serving import make_server
+
+DEFAULT_PATHS = ["/brands/JSON", "/regions/America"]
+
+
+# ---------------------------------
+# Start the app in a background thread
+# ---------------------------------
+def start_server(port: int):
+    """
+    Serve app.py with Werkzeug's threaded server on localhost.
+    Returns the server so the caller can shut it down.
+    """
+    from app import create_app
+
+    app = create_app()
+    app.secret_key = "bench_secret_key"
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("localhost", port, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+# ---------------------------------
+# Load generation
+# ---------------------------------
+def hammer(url: str, threads: int, requests_per_thread: int):
+    """
+    Issue requests_per_thread GETs to url from each of threads workers.
+    Returns (requests/sec, error count).
+    """
+    errors: List[int] = []
+    lock = threading.Lock()
+
+    def worker():
+        failed = 0
+        for _ in range(requests_per_thread):
+            try:
+                with urllib.request.urlopen(url) as resp:
+                    resp.read()
+            except (urllib.error.URLError, ConnectionError):
+                failed += 1
+        with lock:
+            errors.append(failed)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    total = threads * requests_per_thread
+    return total / elapsed, sum(errors)
+
+
+# -----------------------
+# Entry point for script
+# -----------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per thread")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("paths", nargs="*", default=DEFAULT_PATHS)
+    args = parser.parse_args()
+
+    server = start_server(args.port)
+    try:
+        for path in args.paths:
+            url = f"http://localhost:{args.port}{path}"
+            rps, errors = hammer(url, args.threads, args.requests)
+            print(f"{path:<30} threads={args.threads:<3} {rps:>9.1f} req/s  errors={errors}")
+    finally:
+        server.shutdown()
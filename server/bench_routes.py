@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+"""
+bench_routes.py: Drive every read route of app.py through the Flask test
+client against synthetic catalogs of increasing size, and record latency
+percentiles, SQL statements per request and peak Python memory per route.
+
+Each scale runs in its own process (app.py binds its engine at import) on
+a fresh database from db_generate.py. The report is printed as a table and
+can be saved as JSON to compare across versions.
+
+Usage:
+    python bench_routes.py --scales small medium --requests 50 --output report.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Final
+
+# name -> (users, regions, whiskeys)
+SCALES: Final = {
+    "small": (100, 10, 1_000),
+    "medium": (1_000, 50, 10_000),
+    "large": (5_000, 100, 100_000),
+    "xlarge": (20_000, 200, 1_000_000),
+}
+MEMORY_SAMPLES: Final[int] = 3
+
+
+# ---------------------------------
+# Worker: runs inside the per-scale process
+# ---------------------------------
+def sample_urls(session) -> list[tuple[str, str]]:
+    """
+    (route label, concrete URL) pairs, using the biggest region and a
+    typical whiskey of the generated catalog.
+    """
+    from urllib.parse import quote
+
+    from db_models import Region, Whiskey
+    from sqlalchemy import func, select
+
+    region_id, region_name = session.execute(
+        select(Region.id, Region.name)
+        .join(Whiskey, Whiskey.region_id == Region.id)
+        .group_by(Region.id)
+        .order_by(func.count(Whiskey.id).desc())
+        .limit(1)
+    ).one()
+    whiskey_id, whiskey_name = session.execute(
+        select(Whiskey.id, Whiskey.name).order_by(Whiskey.id).limit(1)
+    ).one()
+
+    return [
+        ("/", "/"),
+        ("/regions", "/regions"),
+        ("/regions/<region>", f"/regions/{quote(region_name)}"),
+        ("/brands", "/brands"),
+        ("/brands/<brand>", f"/brands/{quote(whiskey_name)}"),
+        ("/brands/JSON", "/brands/JSON"),
+        ("/brands/JSON?limit=100", "/brands/JSON?limit=100"),
+        ("/regions/JSON", "/regions/JSON"),
+        ("/brands/<id>/JSON", f"/brands/{whiskey_id}/JSON"),
+        ("/regions/<id>/JSON", f"/regions/{region_id}/JSON"),
+        ("/brands/XML", "/brands/XML"),
+        ("/regions/XML", "/regions/XML"),
+        ("/search/JSON?q=oak", "/search/JSON?q=oak"),
+    ]
+
+
+def fetch(client, url: str) -> int:
+    """
+    GET url and consume the body chunk by chunk, as a network client would,
+    so streamed responses are not buffered by the test client.
+    Returns the status code.
+    """
+    response = client.get(url, buffered=False)
+    for _ in response.response:
+        pass
+    response.close()
+    return response.status_code
+
+
+def measure(client, counter: list, url: str, requests: int) -> dict:
+    """
+    Time requests GETs of url, then sample peak traced memory separately so
+    tracing overhead does not skew the latencies.
+    """
+    status = fetch(client, url)  # warm caches and connections
+
+    latencies, statements = [], []
+    for _ in range(requests):
+        counter[0] = 0
+        start = time.perf_counter()
+        fetch(client, url)
+        latencies.append((time.perf_counter() - start) * 1000)
+        statements.append(counter[0])
+
+    tracemalloc.start()
+    peak = 0
+    for _ in range(MEMORY_SAMPLES):
+        tracemalloc.reset_peak()
+        fetch(client, url)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    pct = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "status": status,
+        "p50_ms": round(pct[49], 3),
+        "p95_ms": round(pct[94], 3),
+        "p99_ms": round(pct[98], 3),
+        "sql_per_request": round(statistics.mean(statements), 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run_worker(requests: int) -> list[dict]:
+    """
+    Benchmark every route against the database in DATABASE_URL.
+    """
+    import logging
+
+    from app import create_app, engine, session
+    from sqlalchemy import event
+
+    app = create_app()
+    app.secret_key = "bench_secret_key"
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    counter = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(*args):
+        counter[0] += 1
+
+    with app.app_context():
+        urls = sample_urls(session)
+
+    client = app.test_client()
+    return [
+        {"route": label, **measure(client, counter, url, requests)}
+        for label, url in urls
+    ]
+
+
+# ---------------------------------
+# Driver: one process per scale
+# ---------------------------------
+def run_scale(name: str, requests: int) -> dict:
+    from db_engine import make_engine
+    from db_generate import generate
+
+    users, regions, whiskeys = SCALES[name]
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    db_uri = f"sqlite:///{path}"
+    try:
+        engine = make_engine(db_uri)
+        generate(engine, users, regions, whiskeys)
+        engine.dispose()
+
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", "--requests", str(requests)],
+            env={**os.environ, "DATABASE_URL": db_uri},
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        results = json.loads(proc.stdout.strip().splitlines()[-1])
+    finally:
+        os.remove(path)
+
+    return {"users": users, "regions": regions, "whiskeys": whiskeys, "results": results}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(report: dict) -> None:
+    for name, scale in report["scales"].items():
+        print(f"\n== {name}: {scale['users']} users, {scale['regions']} regions, "
+              f"{scale['whiskeys']} whiskeys ==")
+        print(f"{'route':<24}{'status':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+              f"{'SQL/req':>9}{'peak KiB':>11}")
+        for r in scale["results"]:
+            print(f"{r['route']:<24}{r['status']:>7}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+                  f"{r['p99_ms']:>10.2f}{r['sql_per_request']:>9}{r['peak_kib']:>11.1f}")
+
+
+# -----------------------
+# Entry point for script
+# -----------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", nargs="+", choices=tuple(SCALES), default=["small", "medium"])
+    parser.add_argument("--requests", type=int, default=30, help="timed requests per route")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.requests)))
+        sys.exit(0)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "requests_per_route": args.requests,
+        },
+        "scales": {name: run_scale(name, args.requests) for name in args.scales},
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+bench_serialize.py: Compare rows/sec of the ORM serialize-property path with
+the column projection path in serializers.py for a full whiskey export.
+
+Usage:
+    python bench_serialize.py --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from bench_indexes import build_catalog
+from db_engine import make_engine
+from db_models import Whiskey
+from serializers import WHISKEY_PROJECTION, orjson
+from sqlalchemy.orm import Session
+
+
+def property_path(engine) -> int:
+    """
+    The original export: load ORM objects, call .serialize, json.dumps.
+    """
+    with Session(engine) as session:
+        brands = session.query(Whiskey).all()
+        payload = json.dumps({"AllBrands": [i.serialize for i in brands]})
+    return len(payload)
+
+
+def projection_path(engine, batch: int = 1000) -> int:
+    """
+    The projection export: column tuples in batches, encoded per batch.
+    """
+    size = 0
+    with Session(engine) as session:
+        stmt = WHISKEY_PROJECTION.select().execution_options(yield_per=batch)
+        for rows in session.execute(stmt).partitions():
+            size += len(WHISKEY_PROJECTION.encode_rows(rows))
+    return size
+
+
+def timed(fn, engine, rows: int) -> float:
+    start = time.perf_counter()
+    fn(engine)
+    return rows / (time.perf_counter() - start)
+
+
+# -----------------------
+# Entry point for script
+# -----------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson' if orjson is not None else 'json'}")
+    for rows in args.sizes:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        engine = make_engine(f"sqlite:///{path}")
+        try:
+            build_catalog(engine, rows)
+            old = timed(property_path, engine, rows)
+            new = timed(projection_path, engine, rows)
+            print(f"{rows:>9} whiskeys  serialize: {old:>10.0f} rows/s  "
+                  f"projection: {new:>10.0f} rows/s  ({new / old:.1f}x)")
+        finally:
+            engine.dispose()
+            os.remove(path)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+bench_templates.py: Measure template work on a synthetic catalog.
+
+1. Cold start: time to load every template in a fresh Jinja environment,
+   parsing from source versus loading from the bytecode cache.
+2. Page renders: per page template, the median render and total request
+   time from the Server-Timing header, with fragment caching off and on
+   (warm). Each page's HTML is checked to be identical in both modes.
+
+Usage:
+    python bench_templates.py --whiskeys 100000 --requests 20
+"""
+import argparse
+import os
+import re
+import statistics
+import tempfile
+import time
+
+from db_engine import make_engine
+from db_generate import generate
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+
+def time_cold_load(bytecode_cache=None) -> float:
+    """
+    Milliseconds to load every template into a new environment.
+    """
+    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), bytecode_cache=bytecode_cache)
+    env.add_extension("fragments.FragmentCacheExtension")
+    start = time.perf_counter()
+    for name in env.list_templates():
+        env.get_template(name)
+    return (time.perf_counter() - start) * 1000
+
+
+def server_timing(response) -> dict[str, float]:
+    return {
+        name: float(dur)
+        for name, dur in re.findall(r"(\w+);dur=([\d.]+)", response.headers.get("Server-Timing", ""))
+    }
+
+
+def page_urls(session) -> list[tuple[str, str]]:
+    from urllib.parse import quote
+
+    from db_models import Region, Whiskey
+    from sqlalchemy import func, select
+
+    region = session.execute(
+        select(Region.name)
+        .join(Whiskey, Whiskey.region_id == Region.id)
+        .group_by(Region.id)
+        .order_by(func.count(Whiskey.id).desc())
+        .limit(1)
+    ).scalar_one()
+    return [
+        ("regions.html", "/regions"),
+        ("brands.html", "/brands"),
+        ("showRegion.html", f"/regions/{quote(region)}"),
+        ("search.html", "/search?q=oak"),
+    ]
+
+
+def measure(client, url: str, requests: int) -> tuple[bytes, float, float]:
+    """
+    Warm up once, then return (body, median render ms, median total ms).
+    """
+    body = client.get(url).data
+    render, total = [], []
+    for _ in range(requests):
+        timing = server_timing(client.get(url))
+        render.append(timing["render"])
+        total.append(timing["total"])
+    return body, statistics.median(render), statistics.median(total)
+
+
+# -----------------------
+# Entry point for script
+# -----------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--regions", type=int, default=50)
+    parser.add_argument("--whiskeys", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        bytecode_cache = FileSystemBytecodeCache(cache_dir)
+        time_cold_load(bytecode_cache)  # populate
+        parsed = statistics.median(time_cold_load() for _ in range(5))
+        cached = statistics.median(time_cold_load(bytecode_cache) for _ in range(5))
+    print(f"Cold load of all templates: {parsed:.1f} ms parsing, {cached:.1f} ms from bytecode cache")
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    try:
+        engine = make_engine()
+        generate(engine, args.users, args.regions, args.whiskeys)
+        engine.dispose()
+
+        from app import app, create_app, session
+        from cache import TTLCache
+
+        create_app()
+        app.secret_key = "bench_secret_key"
+        client = app.test_client()
+        with app.app_context():
+            urls = page_urls(session)
+
+        print(f"\n{args.whiskeys} whiskeys, median of {args.requests} requests (ms)")
+        print(f"{'template':<18}{'render off':>12}{'render on':>11}{'total off':>11}{'total on':>10}")
+        fragment_cache = app.jinja_env.fragment_cache or TTLCache(ttl=600, max_entries=1000)
+        for template, url in urls:
+            app.jinja_env.fragment_cache = None
+            body_off, render_off, total_off = measure(client, url, args.requests)
+            app.jinja_env.fragment_cache = fragment_cache
+            body_on, render_on, total_on = measure(client, url, args.requests)
+            assert body_on == body_off, f"cached {url} differs from uncached"
+            print(f"{template:<18}{render_off:>12.1f}{render_on:>11.1f}{total_off:>11.1f}{total_on:>10.1f}")
+    finally:
+        os.remove(path)
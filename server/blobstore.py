@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+"""
+blobstore.py: Content-addressed storage for uploaded images.
+
+An upload is written to a temporary file while its SHA-256 is computed,
+then renamed to <folder>/<ab>/<cd>/<sha256>.<ext>. Identical photos end up
+as one file, and a file's URL never changes meaning, so it can be cached
+forever. Upload rows count the whiskeys that reference each file; the file
+is deleted when the last one lets go.
+
+Images saved before the store existed keep their plain names in the flat
+upload folder. Run as a script to move them into the store:
+    python blobstore.py [db_uri] [upload_folder]
+"""
+import hashlib
+import logging
+import os
+import re
+import sys
+import tempfile
+from typing import BinaryIO, Final
+
+from db_models import Upload, Whiskey
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE: Final[int] = 64 * 1024
+
+# INSERT constructs of the dialects with ON CONFLICT DO UPDATE
+_UPSERTS: Final = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+_BLOB_NAME = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+$")
+
+
+# ---------------------------------
+# Paths
+# ---------------------------------
+def is_blob_name(name: str) -> bool:
+    """
+    True for names produced by store(), False for legacy upload names.
+    """
+    return bool(_BLOB_NAME.match(name))
+
+
+def blob_dir(folder: str, name: str) -> str:
+    """
+    Directory holding name: two levels of hash-prefix shards for blobs, the
+    upload folder itself for legacy names.
+    """
+    if is_blob_name(name):
+        return os.path.join(folder, name[:2], name[2:4])
+    return folder
+
+
+def blob_path(folder: str, name: str) -> str:
+    return os.path.join(blob_dir(folder, name), name)
+
+
+# ---------------------------------
+# Writing
+# ---------------------------------
+def store(folder: str, stream: BinaryIO, ext: str) -> tuple[str, int]:
+    """
+    Copy stream into the store, hashing it as it is written.
+    Returns (blob name, size in bytes). If the same bytes are already
+    stored, the existing file is atomically replaced by an identical one.
+    """
+    tmp_dir = os.path.join(folder, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+        try:
+            while chunk := stream.read(CHUNK_SIZE):
+                digest.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+        except BaseException:
+            os.remove(tmp.name)
+            raise
+
+    name = f"{digest.hexdigest()}.{ext.lower()}"
+    os.makedirs(blob_dir(folder, name), exist_ok=True)
+    os.replace(tmp.name, blob_path(folder, name))
+    return name, size
+
+
+# ---------------------------------
+# Reference counting
+# ---------------------------------
+def add_ref(session, name: str, size: int) -> None:
+    """
+    Record one more whiskey using blob name. Safe when two transactions add
+    the first reference to the same bytes at once.
+    """
+    increment = update(Upload).where(Upload.name == name).values(ref_count=Upload.ref_count + 1)
+    upsert = _UPSERTS.get(session.get_bind().dialect.name)
+    if upsert is not None:
+        session.execute(
+            upsert(Upload)
+            .values(name=name, size=size, ref_count=1)
+            .on_conflict_do_update(index_elements=[Upload.name], set_={"ref_count": Upload.ref_count + 1})
+        )
+        return
+
+    try:
+        with session.begin_nested():
+            if not session.execute(increment).rowcount:
+                session.add(Upload(name=name, size=size, ref_count=1))
+    except IntegrityError:
+        # Another transaction inserted the row first
+        session.execute(increment)
+
+
+def release(session, name: str) -> bool:
+    """
+    Record one fewer whiskey using name, after the referencing row has been
+    changed or deleted in session.
+    Returns True when nothing references the file any more; the caller
+    deletes the file once its transaction has committed.
+    """
+    if not is_blob_name(name):
+        # Legacy files are shared by name; only the whiskeys themselves know
+        return _unused(session, name)
+
+    session.execute(
+        update(Upload).where(Upload.name == name).values(ref_count=Upload.ref_count - 1)
+    )
+    upload = session.get(Upload, name, populate_existing=True)
+    if upload is None:
+        # A blob nobody counted (e.g. written by an older bulk import)
+        return _unused(session, name)
+    if upload.ref_count <= 0:
+        session.delete(upload)
+        return True
+    return False
+
+
+def _unused(session, name: str) -> bool:
+    """
+    True when no whiskey's img_name is name any more.
+    """
+    session.flush()
+    users = session.scalar(select(func.count(Whiskey.id)).where(Whiskey.img_name == name))
+    return users == 0
+
+
+def remove(folder: str, name: str) -> None:
+    """
+    Delete a stored file, ignoring one that is already gone.
+    """
+    try:
+        os.remove(blob_path(folder, name))
+    except FileNotFoundError:
+        log.warning("Image %s not found for deletion", name)
+
+
+# ---------------------------------
+# Move legacy uploads into the store
+# ---------------------------------
+def migrate_legacy_uploads(session, folder: str) -> int:
+    """
+    Move every file referenced by a legacy Whiskey.img_name into the store
+    and repoint the whiskeys at the blob. Returns the number of files moved.
+    """
+    legacy = [
+        name
+        for name in session.scalars(select(Whiskey.img_name).where(Whiskey.img_name.is_not(None)).distinct())
+        if not is_blob_name(name)
+    ]
+    moved = 0
+    for old_name in legacy:
+        path = os.path.join(folder, old_name)
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            new_name, size = store(folder, f, old_name.rsplit(".", 1)[-1])
+
+        whiskeys = session.scalars(select(Whiskey).where(Whiskey.img_name == old_name)).all()
+        for whiskey in whiskeys:
+            whiskey.img_name = new_name
+            add_ref(session, new_name, size)
+        session.commit()
+        os.remove(path)
+        moved += 1
+    return moved
+
+
+# -----------------------
+# Entry point for script
+# -----------------------
+if __name__ == "__main__":
+    from db_engine import make_engine
+    from sqlalchemy.orm import Session
+
+    db_uri = sys.argv[1] if len(sys.argv) > 1 else None
+    upload_folder = sys.argv[2] if len(sys.argv) > 2 else "./uploads"
+    with Session(make_engine(db_uri)) as session:
+        print(f"Moved {migrate_legacy_uploads(session, upload_folder)} uploads into the store.")
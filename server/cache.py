@@ -0,0 +1,71 @@
+"""
+cache.py: Small thread-safe in-process cache with per-entry expiry and
+explicit invalidation, shared by the request threads of one worker.
+"""
+import threading
+import time
+from typing import Any, Callable, Hashable, Optional
+
+
+class DontStore:
+    """
+    Returned by a get_or_set() compute function to hand value back to the
+    caller without caching it.
+    """
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+class TTLCache:
+    """
+    Maps keys to values that expire ttl seconds after they were computed.
+
+    invalidate() bumps a generation counter, so a value that was being
+    computed while the cache was invalidated is returned to its caller but
+    not stored; the next reader recomputes from fresh data.
+
+    With max_entries set, storing a new key beyond the limit evicts the
+    least recently stored one.
+    """
+
+    def __init__(self, ttl: float, max_entries: Optional[int] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: dict[Hashable, tuple[float, Any]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, computing and storing it if missing
+        or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+            generation = self._generation
+
+        value = compute()
+        if isinstance(value, DontStore):
+            return value.value
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries.pop(key, None)
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                if self.max_entries is not None and len(self._entries) > self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        Drop key, or every entry when key is None.
+        """
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
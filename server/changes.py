@@ -0,0 +1,95 @@
+"""
+changes.py: The change feed behind /changes, shared by the Flask app and
+the async API.
+
+Every insert or update of a region or whiskey stamps the row with the next
+number of one catalog-wide sequence (change_seq), and every delete leaves a
+Tombstone with a number of its own (see reserve_change_seqs in
+db_models.py). The feed lists what happened after a given number, oldest
+first, each row once in its latest state:
+
+    GET /changes               {"changes": [], "since": 1042, "more": false}
+    GET /changes?since=1042    {"changes": [{"seq": 1043, "entity": "whiskey",
+                                 "op": "upsert", "data": {...}}, ...],
+                                "since": 1051, "more": false}
+
+A mirror starts by calling /changes without since, then pulls the full
+catalog, then polls with the since of each response. An upsert carries the
+whole row, so replaying one the mirror already has is harmless.
+"""
+import heapq
+from typing import Final, Mapping, Optional, Sequence
+
+from db_models import CHANGE_FEED, CatalogVersion, Region, Tombstone, Whiskey
+from paging import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from serializers import REGION_PROJECTION, WHISKEY_PROJECTION
+from sqlalchemy import Select, select
+
+# Published entities: the projection of their rows and their change_seq column
+FEED_SOURCES: Final = {
+    "region": (REGION_PROJECTION, Region.change_seq),
+    "whiskey": (WHISKEY_PROJECTION, Whiskey.change_seq),
+}
+
+
+def parse_since(args: Mapping[str, str]) -> tuple[Optional[int], int]:
+    """
+    (since, limit) from query arguments; since is None when not given.
+    limit defaults to DEFAULT_PAGE_SIZE and is clamped to MAX_PAGE_SIZE.
+    Raises ValueError on bad input.
+    """
+    since = int(args["since"]) if "since" in args else None
+    limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    if limit < 1 or (since is not None and since < 0):
+        raise ValueError("limit must be positive and since non-negative")
+    return since, min(limit, MAX_PAGE_SIZE)
+
+
+def current_seq_select() -> Select:
+    """
+    SELECT the last change number handed out.
+    """
+    return select(CatalogVersion.version).where(CatalogVersion.entity == CHANGE_FEED)
+
+
+def feed_selects(since: int, limit: int) -> list[Select]:
+    """
+    One SELECT per published entity, then one for tombstones, each reading
+    at most limit + 1 changes after since in sequence order.
+    """
+    stmts = [
+        projection.select().add_columns(column).where(column > since).order_by(column).limit(limit + 1)
+        for projection, column in FEED_SOURCES.values()
+    ]
+    stmts.append(
+        select(Tombstone.entity, Tombstone.entity_id, Tombstone.change_seq)
+        .where(Tombstone.change_seq > since)
+        .order_by(Tombstone.change_seq)
+        .limit(limit + 1)
+    )
+    return stmts
+
+
+def feed_page(results: Sequence[Sequence], since: int, limit: int) -> dict:
+    """
+    Merge the rows of the feed_selects() into the /changes response body.
+    """
+    streams = []
+    for (entity, (projection, _)), rows in zip(FEED_SOURCES.items(), results):
+        streams.append([
+            {"seq": row[-1], "entity": entity, "op": "upsert", "data": data}
+            for row, data in zip(rows, projection.to_dicts(row[:-1] for row in rows))
+        ])
+    streams.append([
+        {"seq": seq, "entity": entity, "op": "delete", "id": entity_id}
+        for entity, entity_id, seq in results[-1]
+    ])
+
+    changes = list(heapq.merge(*streams, key=lambda c: c["seq"]))
+    more = len(changes) > limit
+    changes = changes[:limit]
+    return {
+        "changes": changes,
+        "since": changes[-1]["seq"] if changes else since,
+        "more": more,
+    }
@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+"""
+db_bulk.py: Bulk import and export of the whiskey catalog as CSV or
+JSON lines, without going through the web app.
+
+Rows are read and written as a stream. Imports are applied in batches of
+executemany INSERTs and UPDATEs, each batch in one transaction. A row whose
+natural key already exists (User.email, Region.name, Whiskey.name) updates
+the existing row instead of adding a duplicate. Whiskeys refer to their
+region by name and their creator by email, so files move cleanly between
+databases.
+
+Whiskey images are counted in the upload store like uploads from the app:
+each imported img_name takes a reference, and an image an upsert replaces is
+released and deleted from --uploads once nothing uses it.
+
+Usage:
+    python db_bulk.py import whiskey feed.csv
+    python db_bulk.py export whiskey catalog.jsonl
+    python db_bulk.py --db postgresql://... import user users.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from typing import Iterable, Iterator
+
+from blobstore import add_ref, blob_path, is_blob_name, release, remove
+from db_engine import DEFAULT_DATABASE_URL, make_engine
+from db_models import (
+    Base,
+    CatalogVersion,
+    Region,
+    User,
+    Whiskey,
+    ensure_catalog_versions,
+    parse_strengths,
+    reserve_change_seqs,
+    utcnow,
+)
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+from thumbnails import remove_derivatives
+
+DEFAULT_BATCH_SIZE = 10_000
+DEFAULT_UPLOAD_FOLDER = "./uploads"
+
+# Columns written and read for each entity, in file order
+FIELDS = {
+    "user": ("name", "email", "picture"),
+    "region": ("name", "user"),
+    "whiskey": (
+        "name", "description", "img_name", "type", "manufacturer",
+        "abv", "proof", "region", "user",
+    ),
+}
+MODELS = {"user": User, "region": Region, "whiskey": Whiskey}
+# Natural key each entity is upserted on
+KEYS = {"user": "email", "region": "name", "whiskey": "name"}
+
+
+# ---------------------------------
+# File formats
+# ---------------------------------
+def file_format(path: str, fmt: str = "") -> str:
+    if fmt:
+        return fmt
+    return "csv" if path.endswith(".csv") else "jsonl"
+
+
+def read_rows(path: str, fmt: str) -> Iterator[dict]:
+    """
+    Yield one dict per record of a CSV (with header) or JSON-lines file.
+    Empty CSV cells are read as None.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                yield {k: (v if v != "" else None) for k, v in row.items()}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def write_rows(path: str, fmt: str, fields: tuple, rows: Iterable[tuple]) -> int:
+    """
+    Write rows (tuples in fields order) to path. Returns the row count.
+    """
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                f.write(json.dumps(dict(zip(fields, row))) + "\n")
+                count += 1
+    return count
+
+
+def batches(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ---------------------------------
+# Import
+# ---------------------------------
+def lookup(conn, column, keys) -> dict:
+    """
+    Map each of keys found in column to its row id, in one query.
+    """
+    table = column.class_
+    return dict(conn.execute(select(column, table.id).where(column.in_(keys))).all())
+
+
+def resolve_refs(conn, entity: str, batch: list[dict]) -> tuple[list[dict], int]:
+    """
+    Replace the region name / user email references in batch with ids and
+    parse whiskey strengths into numbers.
+    Returns (rows with all references resolved, number of rows skipped).
+    """
+    if entity == "user":
+        return batch, 0
+
+    users = lookup(conn, User.email, {r["user"] for r in batch if r.get("user")})
+    regions = {}
+    if entity == "whiskey":
+        regions = lookup(conn, Region.name, {r["region"] for r in batch if r.get("region")})
+
+    resolved, skipped = [], 0
+    for row in batch:
+        row = dict(row)
+        row["user_id"] = users.get(row.pop("user", None))
+        if entity == "whiskey":
+            row["region_id"] = regions.get(row.pop("region", None))
+            if row["region_id"] is None:
+                skipped += 1
+                continue
+            row["abv"], row["proof"] = parse_strengths(row.get("abv"), row.get("proof"))
+        if row["user_id"] is None:
+            skipped += 1
+            continue
+        resolved.append(row)
+    return resolved, skipped
+
+
+def stored_size(folder: str, name: str) -> int:
+    """
+    Size of an image in the upload folder, 0 when it is not there.
+    """
+    try:
+        return os.path.getsize(blob_path(folder, name))
+    except OSError:
+        return 0
+
+
+def update_image_refs(conn, folder: str, rows: dict[str, dict], old_images: dict[str, str]) -> list[str]:
+    """
+    Count the images of whiskeys just written in the upload store: one more
+    reference for each new img_name and one fewer for each image replaced
+    (old_images maps the keys of updated whiskeys to their previous image).
+    Returns the images nothing references any more, to delete once the
+    transaction has committed.
+    """
+    unused = []
+    with Session(bind=conn) as session:
+        for key, row in rows.items():
+            name = row.get("img_name")
+            if name and name != old_images.get(key) and is_blob_name(name):
+                add_ref(session, name, stored_size(folder, name))
+        # Released after all refs are added, so images swapped between rows stay
+        for key, old in old_images.items():
+            if old and old != rows[key].get("img_name") and release(session, old):
+                unused.append(old)
+        session.flush()
+    return list(dict.fromkeys(unused))
+
+
+def import_file(engine, entity: str, path: str, fmt: str = "",
+                batch_size: int = DEFAULT_BATCH_SIZE,
+                upload_folder: str = DEFAULT_UPLOAD_FOLDER) -> tuple[int, int, int]:
+    """
+    Upsert every record of path into entity's table.
+    Returns (inserted, updated, skipped) counts.
+    """
+    model = MODELS[entity]
+    key = KEYS[entity]
+    key_column = getattr(model, key)
+    columns = [c for c in FIELDS[entity] if c not in ("user", "region")]
+    columns += ["user_id"] if entity != "user" else []
+    columns += ["region_id"] if entity == "whiskey" else []
+    in_feed = "change_seq" in model.__table__.c
+    # The change feed and catalog stamps need their rows, even in a new database
+    ensure_catalog_versions(engine)
+
+    insert_stmt = insert(model.__table__)
+    # Rows of entities in the change feed are stamped with feed numbers
+    stamped = columns + ["change_seq"] if in_feed else columns
+    update_stmt = (
+        update(model.__table__)
+        .where(model.__table__.c.id == bindparam("_id"))
+        .values({c: bindparam(f"_{c}") for c in stamped})
+    )
+
+    inserted = updated = skipped = 0
+    for batch in batches(read_rows(path, file_format(path, fmt)), batch_size):
+        with engine.begin() as conn:
+            rows, missing = resolve_refs(conn, entity, batch)
+            skipped += missing
+
+            # Last record wins when a key repeats within the batch
+            by_key = {row[key]: {c: row.get(c) for c in columns} for row in rows}
+            existing = lookup(conn, key_column, list(by_key))
+
+            new_rows = [r for k, r in by_key.items() if k not in existing]
+            changed = [
+                {"_id": existing[k], **{f"_{c}": v for c, v in r.items()}}
+                for k, r in by_key.items()
+                if k in existing
+            ]
+            old_images = {}
+            if entity == "whiskey" and existing:
+                old_images = dict(conn.execute(
+                    select(Whiskey.name, Whiskey.img_name).where(Whiskey.name.in_(list(existing)))
+                ).all())
+
+            if in_feed and by_key:
+                seqs = iter(reserve_change_seqs(conn, len(by_key)))
+                for row in new_rows:
+                    row["change_seq"] = next(seqs)
+                for row in changed:
+                    row["_change_seq"] = next(seqs)
+            if new_rows:
+                conn.execute(insert_stmt, new_rows)
+            if changed:
+                conn.execute(update_stmt, changed)
+            inserted += len(new_rows)
+            updated += len(changed)
+            unused = update_image_refs(conn, upload_folder, by_key, old_images) if entity == "whiskey" else []
+
+        for name in unused:
+            remove(upload_folder, name)
+            remove_derivatives(upload_folder, name)
+
+    mark_changed(engine, entity)
+    return inserted, updated, skipped
+
+
+def mark_changed(engine, entity: str) -> None:
+    """
+    Bump the entity's catalog version so cached pages and ETags refresh.
+    """
+    with engine.begin() as conn:
+        conn.execute(
+            update(CatalogVersion)
+            .where(CatalogVersion.entity == MODELS[entity].__tablename__)
+            .values(version=CatalogVersion.version + 1, updated_at=utcnow())
+        )
+
+
+# ---------------------------------
+# Export
+# ---------------------------------
+def export_select(entity: str):
+    """
+    SELECT the columns of FIELDS[entity], with references as names/emails.
+    """
+    if entity == "user":
+        return select(User.name, User.email, User.picture).order_by(User.id)
+    if entity == "region":
+        return (
+            select(Region.name, User.email)
+            .outerjoin(User, Region.user_id == User.id)
+            .order_by(Region.id)
+        )
+    return (
+        select(
+            Whiskey.name, Whiskey.description, Whiskey.img_name, Whiskey.type,
+            Whiskey.manufacturer, Whiskey.abv, Whiskey.proof, Region.name, User.email,
+        )
+        .outerjoin(Region, Whiskey.region_id == Region.id)
+        .outerjoin(User, Whiskey.user_id == User.id)
+        .order_by(Whiskey.id)
+    )
+
+
+def export_file(engine, entity: str, path: str, fmt: str = "",
+                batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Stream entity's table to path. Returns the number of rows written.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=batch_size).execute(export_select(entity))
+        return write_rows(path, file_format(path, fmt), FIELDS[entity], result)
+
+
+# -----------------------
+# Entry point for script
+# -----------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=os.environ.get("DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="",
+                        help="file format (default: from the file extension)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--uploads", default=DEFAULT_UPLOAD_FOLDER,
+                        help="upload folder of the imported images (default: %(default)s)")
+    parser.add_argument("action", choices=("import", "export"))
+    parser.add_argument("entity", choices=tuple(MODELS))
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    engine = make_engine(args.db)
+    Base.metadata.create_all(engine)
+
+    if args.action == "import":
+        inserted, updated, skipped = import_file(
+            engine, args.entity, args.path, args.format, args.batch_size, args.uploads
+        )
+        print(f"Inserted {inserted}, updated {updated}, skipped {skipped} {args.entity} rows.")
+        if skipped:
+            print("Skipped rows reference a region or user that does not exist.", file=sys.stderr)
+    else:
+        count = export_file(engine, args.entity, args.path, args.format, args.batch_size)
+        print(f"Exported {count} {args.entity} rows.")
@@ -3,24 +3,25 @@
 create_db.py: Uses SQLAlchemy to create the SQLite database and
 define ORM models for a whiskey catalog application.
 """
+from db_engine import make_engine
 from db_models import Base
 from db_seed import seed
-from sqlalchemy import create_engine
 
 
 # ---------------------------------
 # Function to Create SQLite DB File
 # ---------------------------------
-def create_database(db_uri='sqlite:///whiskey_regions.db'):
+def create_database(db_uri=None, echo=False):
     """
     Initializes the database using the provided URI.
-    By default, creates a local SQLite DB file.
+    By default, uses DATABASE_URL (a local SQLite DB file if unset).
+    Pass echo=True to log every SQL statement.
     """
 
     # -------------------------------------------
     # Setup the database engine and session
     # -------------------------------------------
-    engine = create_engine(db_uri, echo=True)
+    engine = make_engine(db_uri, echo=echo)
     Base.metadata.create_all(engine)
 
     print("Database created successfully.")
@@ -0,0 +1,134 @@
+"""
+db_engine.py: The one place SQLAlchemy engines are created.
+
+Settings come from the environment (or any mapping with the same keys,
+such as app.config), so the app and every script run against the same
+database with the same tuning:
+
+    DATABASE_URL            SQLAlchemy URL, SQLite file by default
+    DATABASE_REPLICA_URLS   comma-separated read replica URLs (app only)
+    DB_POOL_SIZE            connections kept open in the pool
+    DB_MAX_OVERFLOW         extra connections allowed under load
+    DB_POOL_RECYCLE         seconds before a connection is replaced
+    DB_POOL_PRE_PING        test connections before handing them out
+    DB_STATEMENT_TIMEOUT_MS PostgreSQL statement_timeout (0 = none)
+    SQLITE_MMAP_SIZE        bytes of the SQLite file to memory-map
+    REPLICA_RETRY_SECONDS   how long a failed replica stays out of rotation
+
+On SQLite every connection is switched to WAL journaling with
+synchronous=NORMAL, so readers no longer block behind a writer and commits
+skip the per-transaction fsync of the rollback journal.
+"""
+import os
+from typing import Any, Final, Mapping, Optional
+
+from sqlalchemy import URL, Engine, create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+DEFAULT_DATABASE_URL: Final[str] = "sqlite:///whiskey_regions.db"
+
+# Name -> (parser, default) of every setting read from the environment
+SETTINGS: Final = {
+    "DATABASE_URL": (str, DEFAULT_DATABASE_URL),
+    "DATABASE_REPLICA_URLS": (lambda v: [url.strip() for url in v.split(",") if url.strip()], ""),
+    "DB_POOL_SIZE": (int, "10"),
+    "DB_MAX_OVERFLOW": (int, "20"),
+    "DB_POOL_RECYCLE": (int, "1800"),
+    "DB_POOL_PRE_PING": (lambda v: v.lower() == "true", "true"),
+    "DB_STATEMENT_TIMEOUT_MS": (int, "0"),
+    "SQLITE_MMAP_SIZE": (int, str(256 * 1024 * 1024)),
+    "REPLICA_RETRY_SECONDS": (float, "10"),
+}
+
+
+def settings_from_env(environ: Mapping[str, str] = os.environ) -> dict[str, Any]:
+    """
+    Parse every SETTINGS key from environ, falling back to its default.
+    """
+    return {
+        name: parse(environ.get(name, default))
+        for name, (parse, default) in SETTINGS.items()
+    }
+
+
+# ---------------------------------
+# Per-connection setup
+# ---------------------------------
+def _sqlite_pragmas(engine: Engine, mmap_size: int) -> None:
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_conn, record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        cursor.close()
+
+
+# ---------------------------------
+# Engine factories
+# ---------------------------------
+# asyncio driver used for each backend by make_async_engine()
+ASYNC_DRIVERS: Final = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def _is_memory(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _engine_options(url: URL, settings: Mapping[str, Any]) -> dict[str, Any]:
+    """
+    create_engine() arguments shared by the sync and async factories.
+    """
+    options: dict[str, Any] = {"pool_pre_ping": settings["DB_POOL_PRE_PING"]}
+    if not _is_memory(url):
+        # In-memory SQLite lives in one connection; it has no pool to size
+        options.update(
+            pool_size=settings["DB_POOL_SIZE"],
+            max_overflow=settings["DB_MAX_OVERFLOW"],
+            pool_recycle=settings["DB_POOL_RECYCLE"],
+        )
+    timeout_ms = int(settings["DB_STATEMENT_TIMEOUT_MS"])
+    if url.get_backend_name() == "postgresql" and timeout_ms:
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(timeout_ms)}}
+        else:
+            # libpq startup option, applied by the server to every session
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
+    return options
+
+
+def make_engine(url: Optional[str] = None, settings: Optional[Mapping[str, Any]] = None,
+                **kwargs) -> Engine:
+    """
+    Create an engine for url (default: settings["DATABASE_URL"]) tuned by
+    settings (default: the environment). Extra kwargs go to create_engine.
+    """
+    if settings is None:
+        settings = settings_from_env()
+    url = make_url(url or settings["DATABASE_URL"])
+    engine = create_engine(url, **{**_engine_options(url, settings), **kwargs})
+
+    if url.get_backend_name() == "sqlite" and not _is_memory(url):
+        _sqlite_pragmas(engine, settings["SQLITE_MMAP_SIZE"])
+    return engine
+
+
+def make_async_engine(url: Optional[str] = None, settings: Optional[Mapping[str, Any]] = None,
+                      **kwargs) -> AsyncEngine:
+    """
+    make_engine() for asyncio: same database and tuning, reached through the
+    backend's ASYNC_DRIVERS driver (aiosqlite or asyncpg must be installed).
+    """
+    if settings is None:
+        settings = settings_from_env()
+    url = make_url(url or settings["DATABASE_URL"])
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver known for {backend} databases")
+    url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    engine = create_async_engine(url, **{**_engine_options(url, settings), **kwargs})
+
+    if backend == "sqlite" and not _is_memory(url):
+        _sqlite_pragmas(engine.sync_engine, settings["SQLITE_MMAP_SIZE"])
+    return engine
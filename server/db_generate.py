@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+db_generate.py: Fill a database with a synthetic catalog of any size.
+
+Whiskeys are spread over regions and users with a Zipf-like skew, as real
+catalogs are: a few regions (Scotland, America) and a few prolific users
+hold most of the bottles while the long tail holds a handful each. The
+output is deterministic for a given --seed.
+
+Usage:
+    python db_generate.py --users 1000 --regions 50 --whiskeys 100000 --db sqlite:///bench.db
+"""
+import argparse
+import datetime
+import itertools
+import os
+import random
+from typing import Final
+
+from db_engine import DEFAULT_DATABASE_URL, make_engine
+from db_models import Base, Region, User, Whiskey
+from search import ensure_search_index
+from sqlalchemy import insert
+
+BATCH_SIZE: Final[int] = 10_000
+
+TYPES: Final = (
+    "Single Malt Scotch", "Blended Scotch", "Kentucky Straight Bourbon", "Rye",
+    "Tennessee Whiskey", "Irish Pot Still", "Japanese Single Malt", "Canadian Whisky",
+    "Wheated Bourbon", "Single Grain",
+)
+WORDS: Final = (
+    "Oak", "Barrel", "Reserve", "Highland", "River", "Copper", "Smoke", "Harbor",
+    "Stone", "Golden", "Old", "Black", "Heritage", "Peat", "Cask", "Valley",
+)
+
+
+def skewed_weights(n: int, s: float) -> list[float]:
+    """
+    Cumulative Zipf weights for n items with exponent s.
+    """
+    return list(itertools.accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+
+
+# ---------------------------------
+# Generate and insert the catalog
+# ---------------------------------
+def generate(engine, users: int, regions: int, whiskeys: int,
+             skew: float = 1.1, seed: int = 42) -> None:
+    """
+    Insert users, regions and whiskeys rows into an empty database.
+    """
+    rng = random.Random(seed)
+    Base.metadata.create_all(engine)
+    user_weights = skewed_weights(users, skew)
+    region_weights = skewed_weights(regions, skew)
+    start = datetime.datetime(2010, 1, 1)
+    span = (datetime.datetime(2026, 1, 1) - start).total_seconds()
+
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {
+                "id": i,
+                "name": f"User {i}",
+                "email": f"user{i}@example.com",
+                "picture": f"https://randomuser.me/api/portraits/men/{i % 100}.jpg",
+            }
+            for i in range(1, users + 1)
+        ])
+        conn.execute(insert(Region.__table__), [
+            {"id": i, "name": f"Region {i}", "user_id": rng.randint(1, users)}
+            for i in range(1, regions + 1)
+        ])
+
+    for offset in range(0, whiskeys, BATCH_SIZE):
+        count = min(BATCH_SIZE, whiskeys - offset)
+        user_ids = rng.choices(range(1, users + 1), cum_weights=user_weights, k=count)
+        region_ids = rng.choices(range(1, regions + 1), cum_weights=region_weights, k=count)
+        rows = []
+        for i, user_id, region_id in zip(range(offset, offset + count), user_ids, region_ids):
+            abv = rng.uniform(40, 65)
+            rows.append({
+                "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+                "description": f"{rng.choice(WORDS)} and {rng.choice(WORDS).lower()} notes, "
+                               f"aged {rng.randint(3, 25)} years.",
+                "type": rng.choice(TYPES),
+                "manufacturer": f"{rng.choice(WORDS)} Distillery {i % 997}",
+                "abv": round(abv, 1),
+                "proof": round(abv * 2, 1),
+                "date_added": start + datetime.timedelta(seconds=rng.uniform(0, span)),
+                "region_id": region_id,
+                "user_id": user_id,
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(Whiskey.__table__), rows)
+
+    # Build the search index in one pass rather than row by row via triggers
+    ensure_search_index(engine)
+
+
+# -----------------------
+# Entry point for script
+# -----------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=os.environ.get("DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--regions", type=int, default=20)
+    parser.add_argument("--whiskeys", type=int, default=10_000)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    generate(make_engine(args.db), args.users, args.regions, args.whiskeys, args.skew, args.seed)
+    print(f"Generated {args.users} users, {args.regions} regions, {args.whiskeys} whiskeys.")
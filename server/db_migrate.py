@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""
+db_migrate.py: Bring an existing whiskey_regions.db up to date with the
+columns and indexes declared in db_models.py.
+
+create_all() only creates missing tables, so databases built before the
+columns and indexes were declared never get them. This script converts the
+text ABV and proof columns of older databases to numbers, adds missing
+columns, creates every declared index that is missing, the full-text search
+index and the catalog change stamps, and refreshes the planner statistics.
+Run it on deploy, before starting workers that skip table creation (see
+wsgi.py).
+"""
+import sys
+from typing import Final
+
+from db_engine import make_engine
+from db_models import Base, Whiskey, ensure_catalog_versions, parse_strengths, utcnow
+from search import ensure_search_index
+from sqlalchemy import Float, String, bindparam, inspect, literal_column, select, text
+
+BATCH_SIZE = 10_000
+
+# Value given to existing rows for declared NOT NULL columns that have no
+# server default, by column name
+BACKFILLS: Final = {"updated_at": utcnow}
+
+
+# ---------------------------------
+# Convert text ABV / proof to numbers
+# ---------------------------------
+def upgrade_strength_columns(engine) -> bool:
+    """
+    Replace whiskey.abv and whiskey.proof, stored as text by older versions,
+    with numeric columns, parsing each value with parse_strengths(). An ABV
+    without a number becomes NULL. Returns True if the columns were converted.
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table("whiskey"):
+        return False
+    columns = {c["name"]: c["type"] for c in inspector.get_columns("whiskey")}
+    if not isinstance(columns.get("abv"), String):
+        return False
+
+    number = Float().compile(dialect=engine.dialect)
+    set_numbers = text("UPDATE whiskey SET abv_num = :abv, proof_num = :proof WHERE id = :id")
+    read_batch = (
+        select(Whiskey.id, literal_column("abv"), literal_column("proof"))
+        .where(Whiskey.id > bindparam("after"))
+        .order_by(Whiskey.id)
+        .limit(BATCH_SIZE)
+    )
+
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE whiskey ADD COLUMN abv_num {number}"))
+        conn.execute(text(f"ALTER TABLE whiskey ADD COLUMN proof_num {number}"))
+        after = 0
+        while rows := conn.execute(read_batch, {"after": after}).all():
+            conn.execute(set_numbers, [
+                dict(zip(("abv", "proof"), parse_strengths(abv, proof)), id=row_id)
+                for row_id, abv, proof in rows
+            ])
+            after = rows[-1].id
+        for name in ("abv", "proof"):
+            conn.execute(text(f"ALTER TABLE whiskey DROP COLUMN {name}"))
+            conn.execute(text(f"ALTER TABLE whiskey RENAME COLUMN {name}_num TO {name}"))
+    return True
+
+
+# ---------------------------------
+# Add any declared column that is missing
+# ---------------------------------
+def upgrade_columns(engine) -> list[str]:
+    """
+    Add the columns declared on the models that existing tables lack.
+    Columns with a server default are filled from it and BACKFILLS columns
+    with their value, both NOT NULL like a fresh schema; others start out
+    NULL. BACKFILLS columns left NULL by an earlier run are filled too.
+    Returns the "table.column" names that were added.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    quote = engine.dialect.identifier_preparer
+    added = []
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                backfill = BACKFILLS.get(column.name) if not column.nullable else None
+                if column.name in existing:
+                    if backfill is not None:
+                        conn.execute(table.update().where(column.is_(None)).values({column: backfill()}))
+                    continue
+                ddl = (
+                    f"ALTER TABLE {quote.format_table(table)} ADD COLUMN "
+                    f"{quote.format_column(column)} {column.type.compile(dialect=engine.dialect)}"
+                )
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg} NOT NULL"
+                elif backfill is not None:
+                    # SQLite only adds NOT NULL columns with a constant default
+                    value = backfill().isoformat(sep=" ", timespec="microseconds")
+                    ddl += f" DEFAULT '{value}' NOT NULL"
+                conn.execute(text(ddl))
+                if backfill is not None and column.server_default is None and engine.dialect.name == "postgresql":
+                    # New rows get the value from the model, as in a fresh schema
+                    conn.execute(text(
+                        f"ALTER TABLE {quote.format_table(table)} "
+                        f"ALTER COLUMN {quote.format_column(column)} DROP DEFAULT"
+                    ))
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+
+# ---------------------------------
+# Create any declared index that is missing
+# ---------------------------------
+def upgrade_indexes(engine) -> list[str]:
+    """
+    Create the indexes declared on the models that the database lacks.
+    Returns the names of the indexes that were created.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+                    created.append(index.name)
+
+        # Refresh statistics so the planner knows about the new indexes
+        if engine.dialect.name in ("sqlite", "postgresql"):
+            conn.execute(text("ANALYZE"))
+
+    return created
+
+
+def upgrade(db_uri=None):
+    """
+    Migrate the database at db_uri (default: DATABASE_URL): create missing
+    tables, convert old columns, add missing ones, then create indexes.
+    """
+    engine = make_engine(db_uri)
+    Base.metadata.create_all(engine)
+    converted = upgrade_strength_columns(engine)
+    added = upgrade_columns(engine)
+    created = upgrade_indexes(engine)
+    if ensure_search_index(engine):
+        created.append("whiskey_fts")
+    ensure_catalog_versions(engine)
+
+    if converted:
+        print("Converted whiskey.abv and whiskey.proof to numbers")
+    for name in added:
+        print(f"Added column {name}")
+    for name in created:
+        print(f"Created index {name}")
+    if not (converted or added or created):
+        print("Database already up to date.")
+
+
+# -----------------------
+# Entry point for script
+# -----------------------
+if __name__ == '__main__':
+    upgrade(*sys.argv[1:2])
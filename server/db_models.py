@@ -1,13 +1,20 @@
 import datetime
-from typing import Optional
+import hashlib
+import re
+from typing import Optional, Sequence
 
-from sqlalchemy import DateTime, ForeignKey, String
+from sqlalchemy import DateTime, Float, ForeignKey, Index, String, insert, select, update
 from sqlalchemy.orm import Mapped, declarative_base, mapped_column, relationship
 
 # Base class for all models using SQLAlchemy ORM
 Base = declarative_base()
 
 
+def utcnow() -> datetime.datetime:
+    """Naive UTC timestamp, as stored in DateTime columns."""
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
 # ----------------------
 # User Model Definition
 # ----------------------
@@ -16,8 +23,11 @@ class User(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(250), nullable=False)
-    email: Mapped[str] = mapped_column(String(250), nullable=False)
+    email: Mapped[str] = mapped_column(String(250), nullable=False, unique=True, index=True)
     picture: Mapped[Optional[str]] = mapped_column(String(250), nullable=True)
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, nullable=False, default=utcnow, onupdate=utcnow
+    )
 
     # Relationships
     whiskeys: Mapped[list["Whiskey"]] = relationship(
@@ -47,9 +57,14 @@ class Region(Base):
     __tablename__ = 'region'
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    name: Mapped[str] = mapped_column(String(250), nullable=False)
+    name: Mapped[str] = mapped_column(String(250), nullable=False, index=True)
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, nullable=False, default=utcnow, onupdate=utcnow
+    )
+    # Position in the change feed of the last write (see reserve_change_seqs)
+    change_seq: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0", index=True)
 
-    user_id: Mapped[int] = mapped_column(ForeignKey('user.id'))
+    user_id: Mapped[int] = mapped_column(ForeignKey('user.id'), index=True)
     user: Mapped["User"] = relationship("User", back_populates="regions")
 
     whiskeys: Mapped[list["Whiskey"]] = relationship(
@@ -70,27 +85,48 @@ class Region(Base):
 # -------------------------
 # Whiskey Model Definition
 # -------------------------
+def _default_proof(context) -> Optional[float]:
+    """Proof of a whiskey inserted without one: twice its ABV."""
+    abv = context.get_current_parameters().get("abv")
+    return abv * 2 if abv is not None else None
+
+
 class Whiskey(Base):
     __tablename__ = 'whiskey'
+    __table_args__ = (
+        # Region pages look up whiskeys by region and list them by name
+        Index('ix_whiskey_region_id_name', 'region_id', 'name'),
+        # Browsing a region by strength is a range scan within the region
+        Index('ix_whiskey_region_id_abv', 'region_id', 'abv'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    name: Mapped[str] = mapped_column(String(250), nullable=False)
+    name: Mapped[str] = mapped_column(String(250), nullable=False, index=True)
     img_name: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     description: Mapped[Optional[str]] = mapped_column(String(450), nullable=True)
     type: Mapped[str] = mapped_column(String(250), nullable=False)
-    date_added: Mapped[datetime.datetime] = mapped_column(DateTime, default=datetime.datetime.now)
+    date_added: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.now, index=True
+    )
     manufacturer: Mapped[str] = mapped_column(String(250), nullable=False)
-    abv: Mapped[str] = mapped_column(String(10), nullable=False)
-    proof: Mapped[Optional[str]] = mapped_column(String(10), nullable=True)
+    abv: Mapped[Optional[float]] = mapped_column(Float, nullable=True, index=True)
+    proof: Mapped[Optional[float]] = mapped_column(
+        Float, nullable=True, index=True, default=_default_proof
+    )
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, nullable=False, default=utcnow, onupdate=utcnow
+    )
+    # Position in the change feed of the last write (see reserve_change_seqs)
+    change_seq: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0", index=True)
 
     region_id: Mapped[int] = mapped_column(ForeignKey('region.id', ondelete="CASCADE"))
     region: Mapped["Region"] = relationship("Region", back_populates="whiskeys")
 
-    user_id: Mapped[int] = mapped_column(ForeignKey('user.id'))
+    user_id: Mapped[int] = mapped_column(ForeignKey('user.id'), index=True)
     user: Mapped["User"] = relationship("User", back_populates="whiskeys")
 
     def __repr__(self):
-        return f"<Whiskey(name='{self.name}', abv='{self.abv}', type='{self.type}')>"
+        return f"<Whiskey(name='{self.name}', abv={self.abv}, type='{self.type}')>"
 
     @property
     def serialize(self):
@@ -105,3 +141,133 @@ class Whiskey(Base):
             'type': self.type,
             'region': self.region.name if self.region else None,
         }
+
+
+def parse_strength(value) -> Optional[float]:
+    """
+    ABV or proof as a number. Text such as "45.20", "40%" or "40.00 - 46.00"
+    gives its first number; anything without one gives None.
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    match = re.search(r"\d+(?:\.\d+)?", str(value))
+    return float(match.group()) if match else None
+
+
+def parse_strengths(abv, proof) -> tuple[Optional[float], Optional[float]]:
+    """
+    (ABV, proof) as numbers, with a missing proof taken as twice the ABV.
+    """
+    abv, proof = parse_strength(abv), parse_strength(proof)
+    if proof is None and abv is not None:
+        proof = abv * 2
+    return abv, proof
+
+
+# ---------------------------------
+# Catalog Version Model Definition
+# ---------------------------------
+class CatalogVersion(Base):
+    """
+    One change stamp per entity table, bumped in the same transaction as any
+    write to that table. Read routes derive their ETag and Last-Modified
+    headers from these rows instead of from the data itself.
+    """
+    __tablename__ = 'catalog_version'
+
+    entity: Mapped[str] = mapped_column(String(50), primary_key=True)
+    version: Mapped[int] = mapped_column(nullable=False, default=0)
+    updated_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False, default=utcnow)
+
+    def __repr__(self):
+        return f"<CatalogVersion(entity='{self.entity}', version={self.version})>"
+
+
+# Tables whose changes are stamped in CatalogVersion
+CATALOG_ENTITIES = ('user', 'region', 'whiskey')
+
+# CatalogVersion row whose version is the last change feed number handed out
+CHANGE_FEED = 'change'
+
+
+def ensure_catalog_versions(engine) -> None:
+    """
+    Create the change stamp row of any entity, and of the change feed, that
+    does not have one yet.
+    """
+    with engine.begin() as conn:
+        existing = set(conn.scalars(select(CatalogVersion.entity)))
+        missing = [e for e in (*CATALOG_ENTITIES, CHANGE_FEED) if e not in existing]
+        if missing:
+            conn.execute(insert(CatalogVersion), [{"entity": e, "version": 0} for e in missing])
+
+
+def catalog_validators(stamps: Sequence, *extra: str) -> tuple[str, Optional[datetime.datetime]]:
+    """
+    (ETag, Last-Modified) for a response built from the entities whose
+    CatalogVersion rows (entity, version, updated_at) are stamps, ordered by
+    entity. extra strings (such as the viewer) are folded into the ETag.
+    """
+    tag = [f"{s.entity}:{s.version}" for s in stamps] + list(extra)
+    etag = hashlib.sha1("|".join(tag).encode()).hexdigest()
+    last_modified = None
+    if stamps:
+        last_modified = max(s.updated_at for s in stamps).replace(
+            microsecond=0, tzinfo=datetime.timezone.utc
+        )
+    return etag, last_modified
+
+
+# ---------------------------------
+# Change feed
+# ---------------------------------
+def reserve_change_seqs(conn, count: int = 1) -> range:
+    """
+    Hand out the next count numbers of the catalog-wide change sequence, for
+    the rows a transaction writes. Call on the writing session or connection:
+    the row lock taken here lasts until commit, so writers commit in sequence
+    order and a reader never sees number n + 1 before n.
+    """
+    last = conn.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.entity == CHANGE_FEED)
+        .values(version=CatalogVersion.version + count, updated_at=utcnow())
+        .returning(CatalogVersion.version)
+    ).scalar_one()
+    return range(last - count + 1, last + 1)
+
+
+class Tombstone(Base):
+    """
+    A deleted region or whiskey, kept so mirrors following the change feed
+    learn about the delete.
+    """
+    __tablename__ = 'tombstone'
+
+    change_seq: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    entity: Mapped[str] = mapped_column(String(50), nullable=False)
+    entity_id: Mapped[int] = mapped_column(nullable=False)
+    deleted_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False, default=utcnow)
+
+    def __repr__(self):
+        return f"<Tombstone(entity='{self.entity}', entity_id={self.entity_id})>"
+
+
+# ------------------------
+# Upload Model Definition
+# ------------------------
+class Upload(Base):
+    """
+    An image in the content-addressed upload store, named by the SHA-256 of
+    its bytes. Whiskeys whose photos have identical bytes share one Upload;
+    ref_count tracks how many Whiskey.img_name values point at it.
+    """
+    __tablename__ = 'upload'
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    size: Mapped[int] = mapped_column(nullable=False)
+    ref_count: Mapped[int] = mapped_column(nullable=False, default=0)
+    created_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False, default=utcnow)
+
+    def __repr__(self):
+        return f"<Upload(name='{self.name}', ref_count={self.ref_count})>"
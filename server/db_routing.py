@@ -0,0 +1,110 @@
+"""
+db_routing.py: Send read-only requests to replica databases.
+
+A RoutingSession binds to the primary engine unless it has been marked as
+serving a read-only request (session.info["replica"] = True), in which case
+it pins one replica for the rest of its life, so every query of a request
+sees the same snapshot. Anything that flushes still goes to the primary.
+
+Replicas are picked round-robin. Each is probed with a SELECT 1 before its
+first use; one whose connection fails is taken out of rotation and probed
+again after REPLICA_RETRY_SECONDS. When none is usable, reads fall back to
+the primary.
+"""
+import itertools
+import logging
+import threading
+import time
+from typing import Final, Optional, Sequence
+
+from sqlalchemy import Engine, event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+log = logging.getLogger(__name__)
+
+DEFAULT_RETRY_SECONDS: Final[float] = 10.0
+
+
+# ---------------------------------
+# Replica pool
+# ---------------------------------
+class ReplicaSet:
+    """
+    Round-robin over replica engines, skipping ones marked down.
+    """
+
+    def __init__(self, engines: Sequence[Engine], retry_seconds: float = DEFAULT_RETRY_SECONDS):
+        self.engines = list(engines)
+        self.retry_seconds = retry_seconds
+        # Engines not yet probed count as down with their retry time passed
+        self._down_until: dict[Engine, float] = dict.fromkeys(self.engines, 0.0)
+        self._cycle = itertools.cycle(self.engines)
+        self._lock = threading.Lock()
+        for engine in self.engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(context.engine)
+
+    def mark_down(self, engine: Engine) -> None:
+        with self._lock:
+            if not self._down_until.get(engine):
+                log.warning("Replica %s is down, taking it out of rotation", engine.url)
+            self._down_until[engine] = time.monotonic() + self.retry_seconds
+
+    def _recheck(self, engine: Engine) -> bool:
+        """
+        Probe a replica whose retry time has come. True if it answered.
+        """
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except DBAPIError:
+            self.mark_down(engine)
+            return False
+        with self._lock:
+            self._down_until.pop(engine, None)
+        log.info("Replica %s is up", engine.url)
+        return True
+
+    def pick(self) -> Optional[Engine]:
+        """
+        The next healthy replica, or None when all are down.
+        """
+        for _ in range(len(self.engines)):
+            with self._lock:
+                engine = next(self._cycle)
+                down_until = self._down_until.get(engine)
+            if down_until is None:
+                return engine
+            if time.monotonic() >= down_until and self._recheck(engine):
+                return engine
+        return None
+
+
+# ---------------------------------
+# Session
+# ---------------------------------
+class RoutingSession(Session):
+    """
+    Session bound to the primary that reads from a replica while
+    info["replica"] is set.
+    """
+
+    def __init__(self, replicas: ReplicaSet, **kwargs):
+        super().__init__(**kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or not self.info.get("replica") or not self.replicas:
+            return self.bind
+        engine = self.info.get("replica_engine")
+        if engine is None:
+            engine = self.replicas.pick() or self.bind
+            self.info["replica_engine"] = engine
+        return engine
@@ -4,14 +4,14 @@ load_whiskey.py: Populate the whiskey_regions.db SQLite database
 with sample user, region, and whiskey entries.
 """
 
+from db_engine import make_engine
 from db_models import Base, Region, User, Whiskey
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 # -------------------------------------------
 # Setup the database engine and session
 # -------------------------------------------
-engine = create_engine('sqlite:///whiskey_regions.db')
+engine = make_engine()
 Base.metadata.create_all(engine)
 
 DBSession = sessionmaker(bind=engine)
@@ -71,7 +71,7 @@ def seed():
     description="A brand of premium small batch Kentucky Straight Bourbon Whiskey...",
     manufacturer="Brown-Forman",
     type="Small batch Kentucky Straight Bourbon Whiskey",
-    abv="45.20",
+    abv=45.2,
     region=america
     ),
     Whiskey(
@@ -80,7 +80,7 @@ def seed():
     description="Produced by Lexington Brewing and Distilling Co of Kentucky...",
     manufacturer="Alltech's Lexington Brewing and Distilling Company",
     type="Kentucky Straight Bourbon Whiskey",
-    abv="40.00",
+    abv=40.0,
     region=america
     ),
     Whiskey(
@@ -89,8 +89,8 @@ def seed():
     description="Heaven Hill Distilleries, family-owned distillery in Bardstown, Kentucky...",
     manufacturer="Heaven Hill",
     type="Kentucky Straight Bourbon Whiskey",
-    abv="40.00",
-    proof="80",
+    abv=40.0,
+    proof=80,
     region=america
     )
     ])
@@ -108,7 +108,7 @@ def seed():
         description="Single malt Highland whisky with the tallest stills in Scotland.",
         manufacturer="Brown-Forman",
         type="Single malt",
-        abv="40.00 - 46.00",
+        abv=40.0,
         region=scotland
     ),
     Whiskey(
@@ -117,7 +117,7 @@ def seed():
         description="Historic distillery on Scotland's west coast, founded in 1794.",
         manufacturer="Diageo",
         type="West Highland",
-        abv="43.00",
+        abv=43.0,
         region=scotland
     ),
     Whiskey(
@@ -126,7 +126,7 @@ def seed():
         description="World-renowned blended Scotch whisky by Diageo.",
         manufacturer="Diageo",
         type="Scotch",
-        abv="40.00",
+        abv=40.0,
         region=scotland
     )
     ])
@@ -144,7 +144,7 @@ def seed():
         description="Golden straw color. Notes of oak, caramel, berries, and citrus.",
         manufacturer="Railway Shed Distillery",
         type="Single Malt",
-        abv="44.00",
+        abv=44.0,
         region=australia
     ),
     Whiskey(
@@ -153,7 +153,7 @@ def seed():
         description="Spicy and buttery rye with a smoky finish. Twice distilled.",
         manufacturer="Archie Rose Distillery",
         type="White Rye",
-        abv="40.00",
+        abv=40.0,
         region=australia
     )
     ])
@@ -170,7 +170,7 @@ def seed():
     description="Spicy and zesty with sweet vanilla and oak notes.",
     manufacturer="Beam Suntory",
     type="Canadian whisky",
-    abv="40.00",
+    abv=40.0,
     region=canada
     )
     session.add(whiskey_canada)
@@ -193,7 +193,7 @@ def seed():
         description="Smooth 80-proof Irish whiskey from Cork.",
         manufacturer="Irish Distillers (Pernod Ricard)",
         type="Irish Whisky",
-        abv="40.00",
+        abv=40.0,
         region=ireland
     ),
     Whiskey(
@@ -202,7 +202,7 @@ def seed():
         description="Iconic blended Irish whiskey from Irish Distillers.",
         manufacturer="Irish Distillers (Pernod Ricard)",
         type="Irish Whisky",
-        abv="40.00",
+        abv=40.0,
         region=ireland
     ),
     Whiskey(
@@ -211,7 +211,7 @@ def seed():
         description="Sweet and smooth Irish whiskey from 180-year-old pot still.",
         manufacturer="Kilbeggan Distilling Company",
         type="Irish Whisky",
-        abv="40.00",
+        abv=40.0,
         region=ireland
     )
     ])
@@ -0,0 +1,128 @@
+"""
+events.py: Fan catalog changes out to Server-Sent Events subscribers.
+
+One Broadcaster per process follows the change feed (see changes.py). While
+anyone is subscribed it reads the feed's position every poll_seconds with a
+single primary-key lookup, fetches new changes once and hands them to every
+subscriber, so the database sees the same load for one watcher or a
+thousand. Changes written by any worker or process arrive, in feed order.
+
+Each subscriber has a bounded queue. One that falls queue_size events behind
+is dropped: its queue is cleared and its stream ends, and the client's
+automatic reconnect resumes from the feed with Last-Event-ID.
+"""
+import asyncio
+import logging
+from typing import AsyncIterator, Final, Optional
+
+from changes import current_seq_select, feed_page, feed_selects
+from paging import MAX_PAGE_SIZE
+from serializers import dumps
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+log = logging.getLogger(__name__)
+
+DEFAULT_POLL_SECONDS: Final[float] = 0.5
+DEFAULT_QUEUE_SIZE: Final[int] = 100
+
+# An idle stream gets a comment line this often, so proxies keep it open
+KEEPALIVE_SECONDS: Final[float] = 15
+# Reconnect delay suggested to clients, in milliseconds
+RETRY_MS: Final[int] = 2000
+
+
+def sse_message(change: dict) -> bytes:
+    """
+    One change as an event whose id is its feed number, so a reconnecting
+    client's Last-Event-ID says where to resume.
+    """
+    return b"id: %d\ndata: %s\n\n" % (change["seq"], dumps(change))
+
+
+class Subscription:
+    """
+    One subscriber's queue of changes. None in the queue ends the stream.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+
+    def drop(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class Broadcaster:
+    """
+    Follows the change feed and publishes each change to all subscribers.
+    """
+
+    def __init__(self, engine: AsyncEngine, poll_seconds: float = DEFAULT_POLL_SECONDS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.engine = engine
+        self.poll_seconds = poll_seconds
+        self.queue_size = queue_size
+        self.subscribers: set[Subscription] = set()
+        # Feed position published so far; None while not following
+        self.seq: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        # Held while the first subscriber starts the follower
+        self._starting = asyncio.Lock()
+
+    async def subscribe(self) -> Subscription:
+        """
+        Add a subscriber. Once this returns, every change after self.seq
+        will reach it.
+        """
+        async with self._starting:
+            if self._task is None:
+                async with self.engine.connect() as conn:
+                    self.seq = (await conn.execute(current_seq_select())).scalar_one()
+                self._task = asyncio.create_task(self._follow())
+            subscription = Subscription(self.queue_size)
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscribers.discard(subscription)
+
+    def publish(self, change: dict) -> None:
+        for subscription in list(self.subscribers):
+            try:
+                subscription.queue.put_nowait(change)
+            except asyncio.QueueFull:
+                log.info("Dropping an event subscriber %d changes behind", self.queue_size)
+                self.subscribers.discard(subscription)
+                subscription.drop()
+
+    async def _follow(self) -> None:
+        try:
+            while self.subscribers:
+                try:
+                    async for change in self.changes_after(self.seq):
+                        self.publish(change)
+                        self.seq = change["seq"]
+                except Exception:
+                    log.exception("Reading the change feed failed")
+                await asyncio.sleep(self.poll_seconds)
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
+                self.seq = None
+
+    async def changes_after(self, since: int) -> AsyncIterator[dict]:
+        """
+        Yield every change after since, oldest first, reading the feed a
+        page at a time. Costs one lookup when nothing changed.
+        """
+        async with self.engine.connect() as conn:
+            if (await conn.execute(current_seq_select())).scalar_one() <= since:
+                return
+            more = True
+            while more:
+                results = [(await conn.execute(stmt)).all() for stmt in feed_selects(since, MAX_PAGE_SIZE)]
+                page = feed_page(results, since, MAX_PAGE_SIZE)
+                for change in page["changes"]:
+                    yield change
+                since, more = page["since"], page["more"]
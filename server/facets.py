@@ -0,0 +1,140 @@
+"""
+facets.py: Filtered whiskey listings with facet counts, shared by the
+Flask app and the async API.
+
+    /brands/filter/JSON?region=Scotland&abv_min=55&limit=50
+
+abv_min/abv_max and proof_min/proof_max are inclusive ranges over the
+indexed numeric columns; region, type and manufacturer match exactly and
+may be repeated to match any of several values. Facet counts for region,
+type, manufacturer and ABV band come back from one UNION ALL query. Each
+facet is counted under every filter except its own, so a client that has
+narrowed to one region still sees how many matches the other regions have.
+"""
+import operator
+from typing import Final, Mapping, Sequence
+
+from db_models import Region, Whiskey
+from sqlalchemy import Select, and_, case, func, literal, select, union_all
+
+# Range parameters: the column they bound and how
+RANGE_FILTERS: Final = {
+    "abv_min": (Whiskey.abv, operator.ge),
+    "abv_max": (Whiskey.abv, operator.le),
+    "proof_min": (Whiskey.proof, operator.ge),
+    "proof_max": (Whiskey.proof, operator.le),
+}
+
+# Exact-match parameters, which are also the value facets
+VALUE_FILTERS: Final = {
+    "region": Region.name,
+    "type": Whiskey.type,
+    "manufacturer": Whiskey.manufacturer,
+}
+
+# ABV facet bands as (label, low, high), low inclusive and high exclusive
+ABV_BANDS: Final = (
+    ("under 40", None, 40),
+    ("40-46", 40, 46),
+    ("46-55", 46, 55),
+    ("55+", 55, None),
+)
+
+# Most values returned per value facet, highest count first
+FACET_LIMIT: Final[int] = 20
+
+Filters = dict[str, object]
+
+
+def parse_filters(args: Mapping[str, Sequence[str]]) -> Filters:
+    """
+    Parse filter parameters from query arguments given as lists of values.
+    Raises ValueError when a range bound is not a number.
+    """
+    filters: Filters = {}
+    for name in RANGE_FILTERS:
+        values = [v for v in args.get(name, ()) if v != ""]
+        if values:
+            filters[name] = float(values[-1])
+    for name in VALUE_FILTERS:
+        values = [v for v in args.get(name, ()) if v != ""]
+        if values:
+            filters[name] = values
+    return filters
+
+
+def filter_conditions(filters: Filters, skip: str = "") -> list:
+    """
+    WHERE clauses for filters, leaving out those of the facet named skip.
+    """
+    conditions = []
+    for name, value in filters.items():
+        if skip and name.startswith(skip):
+            continue
+        if name in RANGE_FILTERS:
+            column, op = RANGE_FILTERS[name]
+            conditions.append(op(column, value))
+        else:
+            conditions.append(VALUE_FILTERS[name].in_(value))
+    return conditions
+
+
+def filtered_select(stmt: Select, filters: Filters) -> Select:
+    """
+    Restrict stmt, a select over whiskeys joined to their region, to filters.
+    """
+    return stmt.where(*filter_conditions(filters))
+
+
+def abv_band():
+    """
+    The ABV_BANDS label of Whiskey.abv, NULL when the ABV is unknown.
+    """
+    whens = []
+    for label, low, high in ABV_BANDS:
+        bounds = []
+        if low is not None:
+            bounds.append(Whiskey.abv >= low)
+        if high is not None:
+            bounds.append(Whiskey.abv < high)
+        whens.append((and_(*bounds), label))
+    return case(*whens, else_=None)
+
+
+def facet_select(filters: Filters) -> Select:
+    """
+    One UNION ALL query returning (facet, value, count) rows for every facet.
+    """
+    facets = {**VALUE_FILTERS, "abv": abv_band()}
+    parts = []
+    for name, value in facets.items():
+        matching = (
+            select(value.label("value"))
+            .select_from(Whiskey)
+            .outerjoin(Region, Whiskey.region_id == Region.id)
+            .where(*filter_conditions(filters, skip=name))
+            .subquery()
+        )
+        counts = (
+            select(matching.c.value, func.count().label("count"))
+            .where(matching.c.value.is_not(None))
+            .group_by(matching.c.value)
+            .order_by(func.count().desc(), matching.c.value)
+            .limit(FACET_LIMIT)
+            .subquery()
+        )
+        parts.append(select(literal(name).label("facet"), counts.c.value, counts.c.count))
+    return union_all(*parts)
+
+
+def facet_counts(rows: Sequence) -> dict[str, list[dict]]:
+    """
+    Group facet_select() rows into {facet: [{"value", "count"}, ...]}, with
+    the ABV bands in ABV_BANDS order.
+    """
+    facets: dict[str, list[dict]] = {name: [] for name in (*VALUE_FILTERS, "abv")}
+    for facet, value, count in rows:
+        facets[facet].append({"value": value, "count": count})
+    band_order = {label: i for i, (label, _, _) in enumerate(ABV_BANDS)}
+    facets["abv"].sort(key=lambda f: band_order[f["value"]])
+    return facets
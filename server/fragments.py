@@ -0,0 +1,66 @@
+"""
+fragments.py: A {% cache %} tag for Jinja templates.
+
+    {% cache "brand-list", catalog_version("whiskey") %}
+        ...expensive markup...
+    {% endcache %}
+
+The block is rendered once per distinct key and served from the
+environment's fragment_cache (a cache.TTLCache) afterwards. Keys carry the
+catalog version of every entity the block shows, so a write anywhere moves
+every worker onto new keys and stale fragments simply age out. Setting
+environment.fragment_cache to None renders every block as if uncached.
+
+Output that will change without a catalog write, such as a placeholder
+shown until a thumbnail exists, calls skip_fragment_cache() while rendering
+so the blocks around it are not stored.
+"""
+from contextvars import ContextVar
+
+from cache import DontStore
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+# One [skip] flag per {% cache %} block being rendered, innermost last
+_open_blocks: ContextVar[tuple] = ContextVar("open_fragment_blocks", default=())
+
+
+def skip_fragment_cache() -> None:
+    """
+    Render the {% cache %} blocks currently being rendered without storing them.
+    """
+    for block in _open_blocks.get():
+        block[0] = True
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_render", [nodes.List(key)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        return cache.get_or_set(tuple(key), lambda: self._render_block(caller))
+
+    def _render_block(self, caller):
+        block = [False]
+        token = _open_blocks.set(_open_blocks.get() + (block,))
+        try:
+            html = caller()
+        finally:
+            _open_blocks.reset(token)
+        return DontStore(html) if block[0] else html
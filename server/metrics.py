@@ -0,0 +1,280 @@
+"""
+metrics.py: Per-request timing and SQL instrumentation.
+
+While a request runs, SQLAlchemy cursor events and Flask template signals
+add up its query count, database time, template render time and any time
+spent in timed("serialize") blocks. The totals are sent back in a
+Server-Timing header and folded into per-route counters that /metrics
+exposes in the Prometheus text format. Statements slower than
+SLOW_QUERY_MS are logged with their route.
+
+Counters live in the worker process; scrape each worker, or sum them
+upstream, when running several.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Final, Iterator, Optional
+
+from flask import (
+    Flask,
+    before_render_template,
+    g,
+    has_app_context,
+    request,
+    request_started,
+    template_rendered,
+)
+from sqlalchemy import event
+
+log = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the request duration histogram buckets
+DURATION_BUCKETS: Final = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Longest statement text written to the slow-query log
+SLOW_QUERY_TEXT_LIMIT: Final[int] = 500
+# Phases timed per request, in Server-Timing order
+PHASES: Final = ("db", "render", "serialize")
+
+
+# ---------------------------------
+# Per-request accumulation
+# ---------------------------------
+class RequestStats:
+    """
+    Counts and timings of the request being handled, kept on flask.g.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.seconds[phase] += seconds
+
+    def server_timing(self) -> str:
+        """
+        Server-Timing header value, durations in milliseconds.
+        """
+        total = time.perf_counter() - self.start
+        parts = [f'db;dur={self.seconds["db"] * 1000:.1f};desc="{self.queries} queries"']
+        parts += [f"{phase};dur={self.seconds[phase] * 1000:.1f}" for phase in PHASES[1:]]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return g.get("_request_stats") if has_app_context() else None
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """
+    Add the time spent in the block to phase of the current request.
+    Outside a request the block runs untimed.
+    """
+    stats = current_stats()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.add(phase, time.perf_counter() - start)
+
+
+# ---------------------------------
+# Process-wide counters
+# ---------------------------------
+class RouteMetrics:
+    """
+    Per-route totals since the worker started.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: dict[tuple[str, str, int], int] = {}
+        self._buckets: dict[str, list[int]] = {}
+        self._duration: dict[str, float] = {}
+        self._queries: dict[str, int] = {}
+        self._phases: dict[tuple[str, str], float] = {}
+        self._slow_queries: dict[str, int] = {}
+        self._templates: dict[str, list] = {}
+
+    def observe(self, route: str, method: str, status: int, duration: float,
+                stats: RequestStats) -> None:
+        with self._lock:
+            key = (route, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            buckets = self._buckets.setdefault(route, [0] * (len(DURATION_BUCKETS) + 1))
+            buckets[bisect.bisect_left(DURATION_BUCKETS, duration)] += 1
+            self._duration[route] = self._duration.get(route, 0.0) + duration
+            self._queries[route] = self._queries.get(route, 0) + stats.queries
+            for phase, seconds in stats.seconds.items():
+                self._phases[route, phase] = self._phases.get((route, phase), 0.0) + seconds
+
+    def template_rendered(self, name: str, seconds: float) -> None:
+        with self._lock:
+            totals = self._templates.setdefault(name, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    def slow_query(self, route: str) -> None:
+        with self._lock:
+            self._slow_queries[route] = self._slow_queries.get(route, 0) + 1
+
+    def render(self) -> str:
+        """
+        All counters in the Prometheus text exposition format.
+        """
+        with self._lock:
+            lines = [
+                "# HELP whiskey_requests_total Requests handled.",
+                "# TYPE whiskey_requests_total counter",
+            ]
+            for (route, method, status), n in sorted(self._requests.items()):
+                lines.append(
+                    f'whiskey_requests_total{{route="{_escape(route)}",method="{method}",'
+                    f'status="{status}"}} {n}'
+                )
+
+            lines += [
+                "# HELP whiskey_request_duration_seconds Time to handle a request.",
+                "# TYPE whiskey_request_duration_seconds histogram",
+            ]
+            for route, buckets in sorted(self._buckets.items()):
+                label = f'route="{_escape(route)}"'
+                cumulative = 0
+                for bound, n in zip(DURATION_BUCKETS + ("+Inf",), buckets):
+                    cumulative += n
+                    lines.append(
+                        f'whiskey_request_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f"whiskey_request_duration_seconds_sum{{{label}}} {self._duration[route]:.6f}")
+                lines.append(f"whiskey_request_duration_seconds_count{{{label}}} {cumulative}")
+
+            lines += [
+                "# HELP whiskey_db_queries_total SQL statements executed.",
+                "# TYPE whiskey_db_queries_total counter",
+            ]
+            for route, n in sorted(self._queries.items()):
+                lines.append(f'whiskey_db_queries_total{{route="{_escape(route)}"}} {n}')
+
+            lines += [
+                "# HELP whiskey_phase_seconds_total Time spent per phase (db, render, serialize).",
+                "# TYPE whiskey_phase_seconds_total counter",
+            ]
+            for (route, phase), seconds in sorted(self._phases.items()):
+                lines.append(
+                    f'whiskey_phase_seconds_total{{route="{_escape(route)}",phase="{phase}"}} {seconds:.6f}'
+                )
+
+            lines += [
+                "# HELP whiskey_slow_queries_total SQL statements slower than SLOW_QUERY_MS.",
+                "# TYPE whiskey_slow_queries_total counter",
+            ]
+            for route, n in sorted(self._slow_queries.items()):
+                lines.append(f'whiskey_slow_queries_total{{route="{_escape(route)}"}} {n}')
+
+            lines += [
+                "# HELP whiskey_template_render_seconds Time spent rendering each page template.",
+                "# TYPE whiskey_template_render_seconds summary",
+            ]
+            for name, (count, seconds) in sorted(self._templates.items()):
+                label = f'template="{_escape(name)}"'
+                lines.append(f"whiskey_template_render_seconds_sum{{{label}}} {seconds:.6f}")
+                lines.append(f"whiskey_template_render_seconds_count{{{label}}} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def route_label() -> str:
+    """
+    The matched URL rule, so /brands/<brand> is one series, not one per brand.
+    """
+    rule = request.url_rule
+    return rule.rule if rule is not None else "<unmatched>"
+
+
+metrics = RouteMetrics()
+
+
+# ---------------------------------
+# Wiring
+# ---------------------------------
+def init_app(app: Flask, *engines) -> None:
+    """
+    Instrument app's requests and the statements of every engine.
+    Reads SLOW_QUERY_MS and SERVER_TIMING from app.config.
+    """
+    slow_query_seconds = app.config.get("SLOW_QUERY_MS", 200) / 1000
+    send_server_timing = app.config.get("SERVER_TIMING", True)
+
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = current_stats()
+        if stats is not None:
+            stats.queries += 1
+            stats.add("db", elapsed)
+        if elapsed >= slow_query_seconds:
+            route = route_label() if stats is not None else "<none>"
+            metrics.slow_query(route)
+            log.warning(
+                "Slow query (%.1f ms) on %s: %s %r",
+                elapsed * 1000, route, statement[:SLOW_QUERY_TEXT_LIMIT], parameters,
+            )
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", start_query)
+        event.listen(engine, "after_cursor_execute", end_query)
+
+    @before_render_template.connect_via(app)
+    def start_render(sender, template, context, **extra):
+        g._render_start = time.perf_counter()
+
+    @template_rendered.connect_via(app)
+    def end_render(sender, template, context, **extra):
+        start = g.pop("_render_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        metrics.template_rendered(template.name or "<string>", elapsed)
+        stats = current_stats()
+        if stats is not None:
+            stats.add("render", elapsed)
+
+    # A signal rather than before_request, so requests refused by an earlier
+    # before_request hook (CSRF) are still counted
+    @request_started.connect_via(app)
+    def start_request(sender, **extra):
+        g._request_stats = RequestStats()
+
+    @app.after_request
+    def add_server_timing(response):
+        # Streamed bodies are still to come; their time shows in /metrics only
+        stats = current_stats()
+        if send_server_timing and stats is not None:
+            response.headers["Server-Timing"] = stats.server_timing()
+        g._response_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(exception=None):
+        stats = current_stats()
+        if stats is None:
+            return
+        status = 500 if exception is not None else g.get("_response_status", 500)
+        metrics.observe(
+            route_label(), request.method, status, time.perf_counter() - stats.start, stats
+        )
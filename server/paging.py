@@ -0,0 +1,51 @@
+"""
+paging.py: Keyset pagination rules of the JSON/XML API, shared by the
+Flask app and the async API so both page identically.
+"""
+from typing import Final, Mapping, Optional, Sequence
+
+from sqlalchemy import Select
+
+# Rows fetched per round trip when streaming full exports
+STREAM_BATCH_SIZE: Final[int] = 1000
+
+# Streamed bodies are sent in chunks of about this many bytes
+STREAM_CHUNK_SIZE: Final[int] = 64 * 1024
+
+# Page sizes for the keyset-paginated API (?limit=&cursor=)
+DEFAULT_PAGE_SIZE: Final[int] = 100
+MAX_PAGE_SIZE: Final[int] = 1000
+
+
+def parse_page_args(args: Mapping[str, str]) -> Optional[tuple[int, int]]:
+    """
+    Parse limit and cursor from query arguments.
+    Returns None when neither is given (full export), else (cursor, limit)
+    with limit clamped to MAX_PAGE_SIZE. Raises ValueError on bad input.
+    """
+    if "limit" not in args and "cursor" not in args:
+        return None
+    limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    cursor = int(args.get("cursor", 0))
+    if limit < 1 or cursor < 0:
+        raise ValueError("limit must be positive and cursor non-negative")
+    return cursor, min(limit, MAX_PAGE_SIZE)
+
+
+def page_select(stmt: Select, id_column, cursor: int, limit: int) -> Select:
+    """
+    Restrict stmt to id_column > cursor, seeking on the primary key index
+    instead of using OFFSET. Reads one extra row to learn whether another
+    page exists.
+    """
+    return stmt.where(id_column > cursor).order_by(id_column).limit(limit + 1)
+
+
+def split_page(rows: Sequence, limit: int) -> tuple[Sequence, Optional[int]]:
+    """
+    Split the rows of a page_select() into (page rows, next_cursor), where
+    next_cursor is None on the last page.
+    """
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1].id
+    return rows, None
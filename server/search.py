@@ -0,0 +1,99 @@
+"""
+search.py: Full-text search over whiskeys.
+
+On SQLite the whiskey table is mirrored into an FTS5 index (whiskey_fts)
+that triggers keep in sync with every insert, update and delete, whether it
+comes from the web app, db_seed.py or a bulk load. Results are ranked by
+bm25 and every search term matches as a prefix. Other databases fall back
+to case-insensitive LIKE matching.
+"""
+import re
+from typing import Final
+
+from db_models import Whiskey
+from serializers import WHISKEY_PROJECTION
+from sqlalchemy import and_, column, inspect, literal_column, or_, table, text
+
+FTS_TABLE: Final[str] = "whiskey_fts"
+SEARCH_COLUMNS: Final = ("name", "manufacturer", "type", "description")
+
+_cols = ", ".join(SEARCH_COLUMNS)
+_new = ", ".join(f"new.{c}" for c in SEARCH_COLUMNS)
+_old = ", ".join(f"old.{c}" for c in SEARCH_COLUMNS)
+
+# External-content FTS5 table: the index stores tokens only, rows live in
+# whiskey. prefix='2 3' keeps short prefix queries on an index lookup.
+FTS_DDL: Final = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_cols}, content='whiskey', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON whiskey BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_cols}) VALUES (new.id, {_new});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON whiskey BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_cols}) VALUES ('delete', old.id, {_old});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON whiskey BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_cols}) VALUES ('delete', old.id, {_old});
+        INSERT INTO {FTS_TABLE}(rowid, {_cols}) VALUES (new.id, {_new});
+    END""",
+]
+
+_fts = table(FTS_TABLE, column("rowid"), column("rank"))
+
+
+# ---------------------------------
+# Index maintenance
+# ---------------------------------
+def ensure_search_index(engine) -> bool:
+    """
+    Create the FTS5 table and its sync triggers if they are missing, and
+    index the existing whiskeys when the table is new.
+    Returns True if the index was created. No-op on non-SQLite databases.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+
+    created = not inspect(engine).has_table(FTS_TABLE)
+    with engine.begin() as conn:
+        for ddl in FTS_DDL:
+            conn.execute(text(ddl))
+        if created:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return created
+
+
+# ---------------------------------
+# Queries
+# ---------------------------------
+def search_terms(q: str) -> list[str]:
+    """
+    Split user input into word tokens, dropping FTS syntax characters.
+    """
+    return re.findall(r"\w+", q)
+
+
+def search_whiskeys(session, q: str, limit: int):
+    """
+    Return up to limit WHISKEY_PROJECTION rows matching every term of q,
+    best match first.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return []
+
+    stmt = WHISKEY_PROJECTION.select()
+    if session.get_bind().dialect.name == "sqlite":
+        match = " ".join(f'"{t}"*' for t in terms)
+        stmt = (
+            stmt.join(_fts, _fts.c.rowid == Whiskey.id)
+            .where(literal_column(FTS_TABLE).op("MATCH")(match))
+            .order_by(_fts.c.rank)
+        )
+    else:
+        columns = [getattr(Whiskey, c) for c in SEARCH_COLUMNS]
+        stmt = stmt.where(
+            and_(*(or_(*(c.ilike(f"%{t}%") for c in columns)) for t in terms))
+        ).order_by(Whiskey.name)
+
+    return session.execute(stmt.limit(limit)).all()
@@ -0,0 +1,94 @@
+"""
+serializers.py: Build API response rows straight from column tuples.
+
+Each Projection holds the columns a response needs and their field names,
+computed once at import. Rows come back from the database as plain tuples
+(related names joined in SQL), so no ORM objects are built and no
+relationships are lazy-loaded. JSON is encoded with orjson when installed.
+Time spent here counts as the request's "serialize" phase in metrics.py.
+"""
+import json
+from typing import Any, Iterable, Sequence
+
+from db_models import Region, User, Whiskey
+from metrics import timed
+from sqlalchemy import Select, select
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+# ---------------------------------
+# JSON encoding
+# ---------------------------------
+if orjson is not None:
+    _encode = orjson.dumps
+else:
+    _encoder = json.JSONEncoder(separators=(",", ":"), default=str)
+
+    def _encode(obj: Any) -> bytes:
+        return _encoder.encode(obj).encode("utf-8")
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode obj as compact JSON bytes."""
+    with timed("serialize"):
+        return _encode(obj)
+
+
+# ---------------------------------
+# Column projections
+# ---------------------------------
+class Projection:
+    """
+    A fixed list of columns and the field names they serialize under.
+    """
+
+    def __init__(self, *columns, joins: Sequence[tuple] = ()):
+        self.columns = columns
+        self.fields = tuple(c.key for c in columns)
+        self.joins = joins
+
+    def select(self) -> Select:
+        """
+        SELECT the projection's columns with its joins applied.
+        """
+        stmt = select(*self.columns)
+        for target, onclause in self.joins:
+            stmt = stmt.outerjoin(target, onclause)
+        return stmt
+
+    def to_dicts(self, rows: Iterable[Sequence]) -> list[dict]:
+        """
+        Turn result rows into dicts keyed by the projection's fields.
+        """
+        fields = self.fields
+        with timed("serialize"):
+            return [dict(zip(fields, row)) for row in rows]
+
+    def encode_rows(self, rows: Iterable[Sequence]) -> bytes:
+        """
+        Encode rows as comma-separated JSON objects, without the enclosing
+        brackets, so batches can be concatenated into one array.
+        """
+        return dumps(self.to_dicts(rows))[1:-1]
+
+
+USER_PROJECTION = Projection(User.id, User.name, User.email, User.picture)
+
+REGION_PROJECTION = Projection(Region.id, Region.name)
+
+WHISKEY_PROJECTION = Projection(
+    Whiskey.id,
+    Whiskey.name,
+    Whiskey.img_name,
+    Whiskey.description,
+    Whiskey.manufacturer,
+    Whiskey.abv,
+    Whiskey.proof,
+    Whiskey.type,
+    Region.name.label("region"),
+    joins=((Region, Whiskey.region_id == Region.id),),
+)
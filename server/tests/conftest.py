@@ -0,0 +1,36 @@
+"""
+Shared test setup.
+
+The server modules import each other as top-level modules, so server/ goes
+on sys.path. app.py builds its engine from DATABASE_URL when first imported,
+so the tests point it at a throwaway SQLite file before anything imports it.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+TEST_DB_DIR = tempfile.mkdtemp(prefix="whiskey-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(TEST_DB_DIR, "app.db")
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+
+
+@pytest.fixture(scope="session")
+def flask_app():
+    """
+    The app, set up once on the test database.
+    """
+    from app import app, create_app
+    create_app()
+    app.secret_key = "test"
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
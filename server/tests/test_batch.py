@@ -0,0 +1,68 @@
+"""
+Multi-get by id at /brands/batch.
+"""
+import json
+
+import pytest
+from db_bulk import import_file
+from db_models import Whiskey
+from sqlalchemy import select
+
+MISSING_ID = 10 ** 9
+
+
+def write_jsonl(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return str(path)
+
+
+@pytest.fixture
+def brand_ids(tmp_path):
+    """
+    Ids of three new whiskeys, by name.
+    """
+    import app
+
+    import_file(app.engine, "user", write_jsonl(tmp_path / "u.jsonl", [{"name": "Batch", "email": "batch@x"}]))
+    import_file(app.engine, "region", write_jsonl(tmp_path / "r.jsonl", [{"name": "Batch Glen", "user": "batch@x"}]))
+    import_file(app.engine, "whiskey", write_jsonl(tmp_path / "w.jsonl", [
+        {"name": f"Batch {n}", "description": "d", "type": "t", "manufacturer": "m",
+         "abv": "40", "region": "Batch Glen", "user": "batch@x"}
+        for n in ("One", "Two", "Three")
+    ]))
+    with app.engine.connect() as conn:
+        return dict(conn.execute(select(Whiskey.name, Whiskey.id).where(Whiskey.name.like("Batch %"))).all())
+
+
+def get_split(client, ids):
+    # Comma-separated and repeated ids= combine
+    first, rest = ",".join(map(str, ids[:3])), "".join(f"&ids={i}" for i in ids[3:])
+    return client.get(f"/brands/batch?ids={first}{rest}")
+
+
+@pytest.mark.parametrize("send", [
+    get_split,
+    lambda client, ids: client.post("/brands/batch", json={"ids": ids}),
+    lambda client, ids: client.post("/brands/batch", json=ids),
+    lambda client, ids: client.post("/brands/batch", data={"ids": [str(i) for i in ids]}),
+], ids=["get", "post-json", "post-list", "post-form"])
+def test_results_follow_request_order(client, brand_ids, send):
+    one, two, three = brand_ids["Batch One"], brand_ids["Batch Two"], brand_ids["Batch Three"]
+
+    # The POSTs carry no CSRF token
+    response = send(client, [three, one, three, MISSING_ID, two])
+    assert response.status_code == 200
+    brands = response.get_json()["Brands"]
+    assert [b.get("name") for b in brands] == ["Batch Three", "Batch One", "Batch Three", None, "Batch Two"]
+    assert brands[3] == {"id": MISSING_ID, "not_found": True}
+
+
+@pytest.mark.parametrize("query", ["", "?ids=", "?ids=1,x", "?ids=" + ",".join(["1"] * 1001)])
+def test_bad_ids(client, query):
+    assert client.get(f"/brands/batch{query}").status_code == 400
+
+
+def test_bad_json_body(client):
+    assert client.post("/brands/batch", json={"ids": [1, 2.5]}).status_code == 400
+    assert client.post("/brands/batch", json={"id": [1]}).status_code == 400
+    assert client.post("/brands/batch", json=[True]).status_code == 400
@@ -0,0 +1,81 @@
+"""
+Reference counting in the upload store.
+"""
+import threading
+
+import pytest
+from blobstore import add_ref, release
+from db_engine import make_engine
+from db_models import Base, Region, Upload, User, Whiskey
+from sqlalchemy.orm import Session
+
+BLOB = "d" * 64 + ".png"
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'blobs.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(name="Ann", email="a@x")
+        region = Region(name="Islay", user=user)
+        session.add_all([user, region])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def add_whiskey(session, name, img_name):
+    region = session.query(Region).one()
+    whiskey = Whiskey(name=name, description="d", type="t", manufacturer="m",
+                      img_name=img_name, region=region, user=region.user)
+    session.add(whiskey)
+    return whiskey
+
+
+def test_release_counts_references(session):
+    add_whiskey(session, "One", BLOB)
+    add_whiskey(session, "Two", BLOB)
+    add_ref(session, BLOB, 10)
+    add_ref(session, BLOB, 10)
+    session.commit()
+    assert session.get(Upload, BLOB).ref_count == 2
+
+    assert release(session, BLOB) is False
+    assert release(session, BLOB) is True
+    session.flush()
+    assert session.get(Upload, BLOB) is None
+
+
+def test_release_of_uncounted_blob_checks_whiskeys(session):
+    # Blobs without an Upload row are still in use while a whiskey names them
+    one = add_whiskey(session, "One", BLOB)
+    add_whiskey(session, "Two", BLOB)
+    session.commit()
+
+    one.img_name = None
+    assert release(session, BLOB) is False
+    session.query(Whiskey).filter_by(name="Two").one().img_name = None
+    assert release(session, BLOB) is True
+
+
+def test_concurrent_first_refs_share_one_row(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'race.db'}")
+    Base.metadata.create_all(engine)
+    barrier = threading.Barrier(4)
+
+    def upload():
+        with Session(engine) as session:
+            barrier.wait()
+            add_ref(session, BLOB, 10)
+            session.commit()
+
+    threads = [threading.Thread(target=upload) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with Session(engine) as session:
+        assert session.get(Upload, BLOB).ref_count == 4
+    engine.dispose()
@@ -0,0 +1,117 @@
+"""
+The change feed behind /changes, fed by the whiskey routes and the bulk importer.
+"""
+import io
+import json
+
+import pytest
+from db_bulk import import_file
+from db_models import User, Whiskey
+from sqlalchemy import select
+
+CSRF_TOKEN = "feed-test-token"
+
+
+def write_jsonl(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return str(path)
+
+
+def whiskey_row(name, region, user):
+    return {"name": name, "description": "d", "type": "t", "manufacturer": "m",
+            "abv": "40", "region": region, "user": user}
+
+
+def changes(client, since, limit=None):
+    url = f"/changes?since={since}" + (f"&limit={limit}" if limit else "")
+    response = client.get(url)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+@pytest.fixture
+def logged_in(client, flask_app, tmp_path, monkeypatch):
+    """
+    A client logged in as a user who owns the region "Feed Glen".
+    """
+    import app
+
+    monkeypatch.setitem(flask_app.config, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    import_file(app.engine, "user", write_jsonl(tmp_path / "u.jsonl", [{"name": "Feeder", "email": "feed@x"}]))
+    import_file(app.engine, "region", write_jsonl(tmp_path / "r.jsonl", [{"name": "Feed Glen", "user": "feed@x"}]))
+    with app.engine.connect() as conn:
+        user_id = conn.scalar(select(User.id).where(User.email == "feed@x"))
+    with client.session_transaction() as login_session:
+        login_session.update(username="Feeder", user_id=user_id, _csrf_token=CSRF_TOKEN)
+    return client
+
+
+def test_routes_record_every_write(logged_in):
+    import app
+
+    start = logged_in.get("/changes").get_json()["since"]
+
+    response = logged_in.post("/whiskey/new", data={
+        "_csrf_token": CSRF_TOKEN, "name": "Feed Dram", "description": "d", "type": "t",
+        "manufacturer": "m", "abv": "43", "region": "Feed Glen",
+        "file": (io.BytesIO(b"jpeg"), "label.jpg"),
+    })
+    assert response.status_code == 302
+    with app.engine.connect() as conn:
+        whiskey_id = conn.scalar(select(Whiskey.id).where(Whiskey.name == "Feed Dram"))
+
+    created = changes(logged_in, start)["changes"]
+    assert [(c["entity"], c["op"], c["data"]["id"]) for c in created] == [("whiskey", "upsert", whiskey_id)]
+    assert created[0]["seq"] > start
+
+    response = logged_in.post(f"/brands/{whiskey_id}/edit", data={
+        "_csrf_token": CSRF_TOKEN, "name": "Feed Dram Edited", "description": "", "type": "",
+        "manufacturer": "", "abv": "", "region": "",
+    })
+    assert response.status_code == 302
+
+    # Only the latest state of the row is listed, under its new number
+    edited = changes(logged_in, start)["changes"]
+    assert [(c["op"], c["data"]["name"]) for c in edited] == [("upsert", "Feed Dram Edited")]
+    assert edited[0]["seq"] > created[0]["seq"]
+    assert changes(logged_in, created[0]["seq"])["changes"] == edited
+
+    response = logged_in.post(f"/brands/{whiskey_id}/delete/", data={"_csrf_token": CSRF_TOKEN})
+    assert response.status_code == 302
+
+    page = changes(logged_in, start)
+    assert page["changes"] == [
+        {"seq": page["since"], "entity": "whiskey", "op": "delete", "id": whiskey_id},
+    ]
+    assert page["since"] > edited[0]["seq"]
+    assert page["more"] is False
+
+
+def test_bulk_import_pages_through_contiguous_seqs(logged_in, tmp_path):
+    import app
+
+    start = logged_in.get("/changes").get_json()["since"]
+    rows = [whiskey_row(f"Paged Dram {i}", "Feed Glen", "feed@x") for i in range(5)]
+    import_file(app.engine, "whiskey", write_jsonl(tmp_path / "w.jsonl", rows))
+
+    with app.engine.connect() as conn:
+        imported = conn.scalars(
+            select(Whiskey.change_seq).where(Whiskey.name.like("Paged Dram %")).order_by(Whiskey.change_seq)
+        ).all()
+    assert imported == list(range(start + 1, start + 6))
+
+    # Walk the feed two at a time across the page boundaries
+    seen, since, more = [], start, True
+    while more:
+        page = changes(logged_in, since, limit=2)
+        assert len(page["changes"]) <= 2
+        assert page["more"] == (page["since"] < start + 5)
+        seen += [c["seq"] for c in page["changes"]]
+        since, more = page["since"], page["more"]
+    assert seen == imported
+    assert changes(logged_in, since) == {"changes": [], "since": since, "more": False}
+
+
+@pytest.mark.parametrize("query", ["since=-1", "since=abc", "limit=0", "since=1&limit=x"])
+def test_bad_since_args(client, query):
+    assert client.get(f"/changes?{query}").status_code == 400
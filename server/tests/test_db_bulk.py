@@ -0,0 +1,79 @@
+"""
+Bulk import into an empty database, and the image references it keeps.
+"""
+import json
+import os
+
+import pytest
+from blobstore import blob_path
+from db_bulk import import_file
+from db_engine import make_engine
+from db_models import CHANGE_FEED, Base, CatalogVersion, Region, Upload, Whiskey
+from sqlalchemy import select
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'bulk.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def write_jsonl(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return str(path)
+
+
+def test_import_into_empty_database(engine, tmp_path):
+    users = write_jsonl(tmp_path / "users.jsonl", [{"name": "Ann", "email": "ann@example.com"}])
+    regions = write_jsonl(tmp_path / "regions.jsonl", [{"name": "Islay", "user": "ann@example.com"}])
+    whiskeys = write_jsonl(tmp_path / "whiskeys.jsonl", [
+        {"name": "Peat One", "description": "Smoky", "type": "Single Malt", "manufacturer": "A",
+         "abv": "46%", "region": "Islay", "user": "ann@example.com"},
+        {"name": "Peat Two", "description": "Smokier", "type": "Single Malt", "manufacturer": "B",
+         "abv": "58.2", "region": "Islay", "user": "ann@example.com"},
+    ])
+
+    assert import_file(engine, "user", users) == (1, 0, 0)
+    assert import_file(engine, "region", regions) == (1, 0, 0)
+    assert import_file(engine, "whiskey", whiskeys) == (2, 0, 0)
+
+    with engine.connect() as conn:
+        versions = dict(conn.execute(select(CatalogVersion.entity, CatalogVersion.version)).all())
+        seqs = conn.scalars(select(Whiskey.change_seq).order_by(Whiskey.change_seq)).all()
+        region_seq = conn.scalar(select(Region.change_seq))
+
+    # Each import bumped its entity, and every row got its own feed number
+    assert versions["user"] == versions["region"] == versions["whiskey"] == 1
+    assert versions[CHANGE_FEED] == 3
+    assert sorted([region_seq, *seqs]) == [1, 2, 3]
+
+
+def test_import_counts_image_refs(engine, tmp_path):
+    uploads = tmp_path / "uploads"
+    shared, replaced, new = ("a" * 64 + ".jpg", "b" * 64 + ".jpg", "c" * 64 + ".jpg")
+    for name in (shared, replaced, new):
+        path = uploads / name[:2] / name[2:4] / name
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"jpeg")
+
+    import_file(engine, "user", write_jsonl(tmp_path / "u.jsonl", [{"name": "Ann", "email": "a@x"}]))
+    import_file(engine, "region", write_jsonl(tmp_path / "r.jsonl", [{"name": "Islay", "user": "a@x"}]))
+
+    def whiskey(name, img):
+        return {"name": name, "description": "d", "type": "t", "manufacturer": "m",
+                "abv": "40", "img_name": img, "region": "Islay", "user": "a@x"}
+
+    first = [whiskey("One", shared), whiskey("Two", shared), whiskey("Three", replaced)]
+    import_file(engine, "whiskey", write_jsonl(tmp_path / "w1.jsonl", first), upload_folder=str(uploads))
+    with engine.connect() as conn:
+        assert dict(conn.execute(select(Upload.name, Upload.ref_count)).all()) == {shared: 2, replaced: 1}
+
+    # Two keeps the shared image; Three's replaced image loses its last user
+    second = [whiskey("Two", shared), whiskey("Three", new)]
+    import_file(engine, "whiskey", write_jsonl(tmp_path / "w2.jsonl", second), upload_folder=str(uploads))
+    with engine.connect() as conn:
+        assert dict(conn.execute(select(Upload.name, Upload.ref_count)).all()) == {shared: 2, new: 1}
+    assert not os.path.exists(blob_path(str(uploads), replaced))
+    assert os.path.exists(blob_path(str(uploads), shared))
@@ -0,0 +1,110 @@
+"""
+Read replica routing with a primary and a replica in two SQLite files.
+"""
+import io
+import json
+
+import pytest
+from db_bulk import import_file
+from db_engine import make_engine
+from db_models import Base, User, ensure_catalog_versions
+from db_routing import ReplicaSet
+from sqlalchemy import select
+
+CSRF_TOKEN = "routing-test-token"
+
+
+def write_jsonl(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return str(path)
+
+
+def region_names(client):
+    response = client.get("/regions/JSON")
+    assert response.status_code == 200
+    return {region["name"] for region in response.get_json()["AllRegions"]}
+
+
+@pytest.fixture
+def replica(tmp_path):
+    """
+    A replica holding only the region "Replica Glen".
+    """
+    engine = make_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(engine)
+    ensure_catalog_versions(engine)
+    import_file(engine, "user", write_jsonl(tmp_path / "u.jsonl", [{"name": "Copy", "email": "copy@x"}]))
+    import_file(engine, "region", write_jsonl(tmp_path / "r.jsonl", [{"name": "Replica Glen", "user": "copy@x"}]))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def unreachable(tmp_path):
+    """
+    A replica whose database file cannot be opened.
+    """
+    engine = make_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    yield engine
+    engine.dispose()
+
+
+def use_replicas(monkeypatch, *engines) -> ReplicaSet:
+    import app
+
+    replicas = ReplicaSet(engines, retry_seconds=60)
+    monkeypatch.setitem(app.DBSession.kw, "replicas", replicas)
+    return replicas
+
+
+def test_reads_go_to_the_replica(client, replica, monkeypatch):
+    use_replicas(monkeypatch, replica)
+    assert region_names(client) == {"Replica Glen"}
+
+
+def test_reads_stick_to_the_primary_after_a_write(client, flask_app, replica, tmp_path, monkeypatch):
+    import app
+
+    monkeypatch.setitem(flask_app.config, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    import_file(app.engine, "user", write_jsonl(tmp_path / "u.jsonl", [{"name": "Router", "email": "router@x"}]))
+    import_file(app.engine, "region", write_jsonl(tmp_path / "r.jsonl", [{"name": "Primary Glen", "user": "router@x"}]))
+    with app.engine.connect() as conn:
+        user_id = conn.scalar(select(User.id).where(User.email == "router@x"))
+    with client.session_transaction() as login_session:
+        login_session.update(username="Router", user_id=user_id, _csrf_token=CSRF_TOKEN)
+    use_replicas(monkeypatch, replica)
+
+    response = client.post("/whiskey/new", data={
+        "_csrf_token": CSRF_TOKEN, "name": "Routed Dram", "description": "d", "type": "t",
+        "manufacturer": "m", "abv": "40", "region": "Primary Glen",
+        "file": (io.BytesIO(b"jpeg"), "label.jpg"),
+    })
+    assert response.status_code == 302
+
+    names = region_names(client)
+    assert "Primary Glen" in names and "Replica Glen" not in names
+
+    # Once the sticky window has passed, reads go back to the replica
+    monkeypatch.setitem(flask_app.config, "REPLICA_STICKY_SECONDS", 0)
+    assert region_names(client) == {"Replica Glen"}
+
+
+def test_unreachable_replica_is_skipped(client, replica, unreachable, monkeypatch):
+    replicas = use_replicas(monkeypatch, unreachable, replica)
+    for _ in range(3):
+        assert region_names(client) == {"Replica Glen"}
+    assert replicas.pick() is replica
+    assert replicas._down_until[unreachable] > 0
+
+
+def test_reads_fall_back_to_the_primary_without_replicas(client, unreachable, monkeypatch):
+    replicas = use_replicas(monkeypatch, unreachable)
+    assert "Replica Glen" not in region_names(client)
+    assert replicas.pick() is None
+
+
+def test_replica_returns_after_its_retry_time(unreachable, tmp_path):
+    replicas = ReplicaSet([unreachable], retry_seconds=0)
+    assert replicas.pick() is None
+    (tmp_path / "missing").mkdir()
+    assert replicas.pick() is unreachable
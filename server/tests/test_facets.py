@@ -0,0 +1,59 @@
+"""
+Filtered listings and their facet counts at /brands/filter/JSON.
+"""
+import json
+
+from db_bulk import import_file
+
+
+def write_jsonl(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return str(path)
+
+
+def whiskey_row(name, region, manufacturer, type, abv):
+    return {"name": name, "description": "d", "type": type, "manufacturer": manufacturer,
+            "abv": abv, "region": region, "user": "facets@x"}
+
+
+def test_each_facet_ignores_only_its_own_filter(client, tmp_path):
+    import app
+
+    import_file(app.engine, "user", write_jsonl(tmp_path / "u.jsonl", [{"name": "Facets", "email": "facets@x"}]))
+    import_file(app.engine, "region", write_jsonl(tmp_path / "r.jsonl", [
+        {"name": "Facet North", "user": "facets@x"},
+        {"name": "Facet South", "user": "facets@x"},
+    ]))
+    import_file(app.engine, "whiskey", write_jsonl(tmp_path / "w.jsonl", [
+        whiskey_row("Facet A", "Facet North", "FacetCo", "Peated", "42"),
+        whiskey_row("Facet B", "Facet North", "FacetCo", "Unpeated", "50"),
+        whiskey_row("Facet C", "Facet South", "FacetCo", "Peated", "58"),
+        whiskey_row("Facet D", "Facet North", "FacetOther", "Peated", "45"),
+        whiskey_row("Facet E", "Facet North", "FacetOther", "Peated", "40"),
+        whiskey_row("Facet F", "Facet North", "FacetCo", "Peated", "38"),
+    ]))
+
+    response = client.get("/brands/filter/JSON?region=Facet+North&manufacturer=FacetCo&abv_min=41")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert sorted(b["name"] for b in body["Brands"]) == ["Facet A", "Facet B"]
+
+    def counts(facet):
+        return {f["value"]: f["count"] for f in body["facets"][facet]}
+
+    # Regions: FacetCo at 41% or more, whatever the region
+    assert counts("region") == {"Facet North": 2, "Facet South": 1}
+    # Manufacturers: Facet North at 41% or more, whoever makes it
+    assert counts("manufacturer") == {"FacetCo": 2, "FacetOther": 1}
+    # Types: every filter applies
+    assert counts("type") == {"Peated": 1, "Unpeated": 1}
+    # ABV bands: Facet North by FacetCo at any strength, in band order
+    assert body["facets"]["abv"] == [
+        {"value": "under 40", "count": 1},
+        {"value": "40-46", "count": 1},
+        {"value": "46-55", "count": 1},
+    ]
+
+
+def test_bad_range_bound(client):
+    assert client.get("/brands/filter/JSON?abv_min=strong").status_code == 400
@@ -0,0 +1,35 @@
+"""
+Headers that decide whether shared caches may store a response.
+"""
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/brands/JSON", "/regions/XML", "/changes"])
+def test_public_responses_set_no_cookies(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.cache_control.public
+    assert "Set-Cookie" not in response.headers
+    assert "Cookie" not in response.vary
+
+
+def test_private_pages_keep_the_csrf_cookie(client):
+    response = client.get("/login")
+    assert "_csrf_token" in response.headers.get("Set-Cookie", "")
+
+
+def test_errors_carry_no_validators(client):
+    response = client.get("/brands/JSON?limit=abc")
+    assert response.status_code == 400
+    assert "ETag" not in response.headers
+    assert "Last-Modified" not in response.headers
+    assert not response.cache_control.public
+
+
+def test_uploads_set_no_cookies(client, flask_app, tmp_path, monkeypatch):
+    (tmp_path / "label.jpg").write_bytes(b"jpeg")
+    monkeypatch.setitem(flask_app.config, "UPLOAD_FOLDER", str(tmp_path))
+    response = client.get("/uploads/label.jpg")
+    assert response.status_code == 200
+    assert "Set-Cookie" not in response.headers
+    assert "Cookie" not in response.vary
@@ -0,0 +1,119 @@
+"""
+db_migrate.py on a database created by the first release of the schema.
+"""
+import pytest
+from db_engine import make_engine
+from db_migrate import upgrade
+from db_models import Whiskey
+from sqlalchemy import Float, inspect, text
+from sqlalchemy.orm import Session
+
+# The tables as the first release created them
+BASELINE_SCHEMA = (
+    """CREATE TABLE user (
+        id INTEGER NOT NULL PRIMARY KEY,
+        name VARCHAR(250) NOT NULL,
+        email VARCHAR(250) NOT NULL,
+        picture VARCHAR(250)
+    )""",
+    """CREATE TABLE region (
+        id INTEGER NOT NULL PRIMARY KEY,
+        name VARCHAR(250) NOT NULL,
+        user_id INTEGER NOT NULL REFERENCES user (id)
+    )""",
+    """CREATE TABLE whiskey (
+        id INTEGER NOT NULL PRIMARY KEY,
+        name VARCHAR(250) NOT NULL,
+        img_name VARCHAR(100),
+        description VARCHAR(450),
+        type VARCHAR(250) NOT NULL,
+        date_added DATETIME,
+        manufacturer VARCHAR(250) NOT NULL,
+        abv VARCHAR(10) NOT NULL,
+        proof VARCHAR(10),
+        region_id INTEGER NOT NULL REFERENCES region (id) ON DELETE CASCADE,
+        user_id INTEGER NOT NULL REFERENCES user (id)
+    )""",
+)
+
+
+def baseline_db(path, strengths=(("40%", None),)) -> str:
+    """
+    A baseline database with one user and region, and one whiskey per
+    (abv, proof) text pair. Returns its URL.
+    """
+    url = f"sqlite:///{path}"
+    engine = make_engine(url)
+    with engine.begin() as conn:
+        for ddl in BASELINE_SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(text("INSERT INTO user (id, name, email) VALUES (1, 'Ann', 'a@x')"))
+        conn.execute(text("INSERT INTO region (id, name, user_id) VALUES (1, 'Islay', 1)"))
+        for i, (abv, proof) in enumerate(strengths, 1):
+            conn.execute(
+                text(
+                    "INSERT INTO whiskey (id, name, type, manufacturer, abv, proof, region_id, user_id) "
+                    "VALUES (:id, :name, 't', 'm', :abv, :proof, 1, 1)"
+                ),
+                {"id": i, "name": f"Whiskey {i}", "abv": abv, "proof": proof},
+            )
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def migrated(tmp_path):
+    url = baseline_db(tmp_path / "baseline.db")
+    upgrade(url)
+    engine = make_engine(url)
+    yield engine
+    engine.dispose()
+
+
+def test_updated_at_matches_a_fresh_schema(migrated):
+    columns = {
+        table: {c["name"]: c for c in inspect(migrated).get_columns(table)}
+        for table in ("user", "region", "whiskey")
+    }
+    for table, by_name in columns.items():
+        assert by_name["updated_at"]["nullable"] is False, table
+
+    with Session(migrated) as session:
+        whiskey = session.get(Whiskey, 1)
+        assert whiskey.updated_at is not None
+        before = whiskey.updated_at
+        whiskey.name = "Renamed"
+        session.commit()
+        assert session.get(Whiskey, 1).updated_at >= before
+
+
+def test_upgrade_twice_changes_nothing(migrated):
+    url = migrated.url.render_as_string(hide_password=False)
+    with migrated.connect() as conn:
+        before = conn.execute(text("SELECT * FROM whiskey ORDER BY id")).all()
+    upgrade(url)
+    with migrated.connect() as conn:
+        assert conn.execute(text("SELECT * FROM whiskey ORDER BY id")).all() == before
+
+
+def test_text_strengths_become_numbers(tmp_path):
+    strengths = {
+        1: (("40%", None), (40.0, 80.0)),
+        2: (("43", "86 proof"), (43.0, 86.0)),
+        3: (("40.00 - 46.00", ""), (40.0, 80.0)),
+        4: (("", ""), (None, None)),
+        5: (("n/a", "junk"), (None, None)),
+        6: (("unknown", "90"), (None, 90.0)),
+    }
+    url = baseline_db(tmp_path / "strengths.db", [text_pair for text_pair, _ in strengths.values()])
+    upgrade(url)
+
+    engine = make_engine(url)
+    columns = {c["name"]: c["type"] for c in inspect(engine).get_columns("whiskey")}
+    assert isinstance(columns["abv"], Float) and isinstance(columns["proof"], Float)
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, abv, proof FROM whiskey ORDER BY id")).all()
+    engine.dispose()
+    assert {row.id: (row.abv, row.proof) for row in rows} == {
+        row_id: numbers for row_id, (_, numbers) in strengths.items()
+    }
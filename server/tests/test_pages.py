@@ -0,0 +1,73 @@
+"""
+Rendered pages stay current when the catalog changes.
+"""
+import json
+import os
+
+import pytest
+from db_bulk import import_file
+
+
+def write_jsonl(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return str(path)
+
+
+def test_landing_page_sees_writes_from_other_processes(client, tmp_path):
+    import app
+
+    assert client.get("/").status_code == 200
+
+    # A bulk import, like another worker, never calls this process's catalog_changed()
+    import_file(app.engine, "user", write_jsonl(tmp_path / "u.jsonl", [{"name": "Ann", "email": "landing@x"}]))
+    import_file(app.engine, "region", write_jsonl(tmp_path / "r.jsonl", [{"name": "Speyside", "user": "landing@x"}]))
+    import_file(app.engine, "whiskey", write_jsonl(tmp_path / "w.jsonl", [
+        {"name": "Freshly Imported", "description": "d", "type": "t", "manufacturer": "m",
+         "abv": "40", "region": "Speyside", "user": "landing@x"},
+    ]))
+
+    response = client.get("/")
+    assert response.status_code == 200
+    assert b"Freshly Imported" in response.data
+
+
+def test_search_box_holds_only_the_search_text(client, tmp_path):
+    import app
+
+    # The landing page lists latest whiskeys and top contributors; none of that belongs in the box
+    import_file(app.engine, "user", write_jsonl(tmp_path / "u.jsonl", [{"name": "Box Owner", "email": "box@x"}]))
+    import_file(app.engine, "region", write_jsonl(tmp_path / "r.jsonl", [{"name": "Campbeltown", "user": "box@x"}]))
+    import_file(app.engine, "whiskey", write_jsonl(tmp_path / "w.jsonl", [
+        {"name": "Box Dram", "description": "d", "type": "t", "manufacturer": "m",
+         "abv": "40", "region": "Campbeltown", "user": "box@x"},
+    ]))
+
+    landing = client.get("/").get_data(as_text=True)
+    assert "Box Dram" in landing
+    assert 'name="q" class="form-control" placeholder="Search whiskeys" value="" />' in landing
+
+    results = client.get("/search?q=dram").get_data(as_text=True)
+    assert 'placeholder="Search whiskeys" value="dram" />' in results
+
+
+def test_region_page_picks_up_thumbnails_once_written(client, flask_app, tmp_path, monkeypatch):
+    import app
+    from thumbnails import derivative_path
+
+    pytest.importorskip("PIL")
+    monkeypatch.setitem(flask_app.config, "UPLOAD_FOLDER", str(tmp_path))
+    image = "f" * 64 + ".jpg"
+    import_file(app.engine, "user", write_jsonl(tmp_path / "u.jsonl", [{"name": "Cards", "email": "cards@x"}]))
+    import_file(app.engine, "region", write_jsonl(tmp_path / "r.jsonl", [{"name": "Orkney", "user": "cards@x"}]))
+    import_file(app.engine, "whiskey", write_jsonl(tmp_path / "w.jsonl", [
+        {"name": "Card Dram", "description": "d", "type": "t", "manufacturer": "m",
+         "abv": "40", "img_name": image, "region": "Orkney", "user": "cards@x"},
+    ]), upload_folder=str(tmp_path))
+
+    assert f"/uploads/{image}".encode() in client.get("/regions/Orkney").data
+
+    # The worker writes the card without any catalog write
+    card = derivative_path(str(tmp_path), "card", image)
+    os.makedirs(os.path.dirname(card))
+    open(card, "wb").close()
+    assert b"/uploads/card/" + ("f" * 64 + ".webp").encode() in client.get("/regions/Orkney").data
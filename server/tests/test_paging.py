@@ -0,0 +1,67 @@
+"""
+Keyset pagination (?limit=&cursor=) of the JSON and XML listings.
+"""
+import json
+
+import pytest
+from db_bulk import import_file
+
+
+def write_jsonl(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return str(path)
+
+
+def walk(client, url):
+    """
+    Every row of a paged listing, following next from the first page.
+    Returns (rows, number of pages).
+    """
+    rows, pages = [], 0
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        body = response.get_json()
+        rows += body["Brands"] if "Brands" in body else body["AllBrands"]
+        pages += 1
+        url = body["next"]
+        assert response.headers.get("Link") == (f'<{url}>; rel="next"' if url else None)
+    return rows, pages
+
+
+@pytest.fixture(scope="module")
+def same_brand(tmp_path_factory):
+    """
+    Seven whiskeys alike in every column but their name and id.
+    """
+    import app
+
+    tmp_path = tmp_path_factory.mktemp("paging")
+    import_file(app.engine, "user", write_jsonl(tmp_path / "u.jsonl", [{"name": "Pager", "email": "pager@x"}]))
+    import_file(app.engine, "region", write_jsonl(tmp_path / "r.jsonl", [{"name": "Page Glen", "user": "pager@x"}]))
+    import_file(app.engine, "whiskey", write_jsonl(tmp_path / "w.jsonl", [
+        {"name": f"Paged {i}", "description": "d", "type": "t", "manufacturer": "PagerCo",
+         "abv": "40", "region": "Page Glen", "user": "pager@x"}
+        for i in range(7)
+    ]))
+
+
+@pytest.mark.parametrize("limit, pages", [(1, 7), (3, 3), (7, 1), (8, 1)])
+def test_walk_rows_sharing_filter_values(client, same_brand, limit, pages):
+    rows, walked = walk(client, f"/brands/filter/JSON?manufacturer=PagerCo&limit={limit}")
+    ids = [row["id"] for row in rows]
+    assert len(ids) == 7
+    assert ids == sorted(set(ids))
+    assert walked == pages
+
+
+def test_pages_add_up_to_the_full_export(client, same_brand):
+    everything = [row["id"] for row in client.get("/brands/JSON").get_json()["AllBrands"]]
+    rows, _ = walk(client, "/brands/JSON?limit=4")
+    assert [row["id"] for row in rows] == everything
+
+
+@pytest.mark.parametrize("path", ["/brands/JSON", "/regions/JSON", "/brands/XML", "/brands/filter/JSON"])
+@pytest.mark.parametrize("query", ["cursor=abc", "cursor=-1", "limit=0", "limit=x", "limit=2.5&cursor=0"])
+def test_malformed_paging_args(client, path, query):
+    assert client.get(f"{path}?{query}").status_code == 400
@@ -0,0 +1,58 @@
+"""
+Statement counts of pages that list many rows.
+"""
+from contextlib import contextmanager
+
+from db_models import Region, User, Whiskey
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+@contextmanager
+def count_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def add_region(engine, name: str, whiskeys: int) -> None:
+    """
+    A region whose whiskeys each have their own creator, so a lazy load per
+    whiskey or per user would show up as extra statements.
+    """
+    with Session(engine) as session:
+        owner = User(name=f"{name} owner", email=f"{name}@regions.test")
+        region = Region(name=name, user=owner)
+        for i in range(whiskeys):
+            user = User(name=f"{name} user {i}", email=f"{name}-{i}@regions.test")
+            session.add(Whiskey(
+                name=f"{name} {i}", description="d", type="t", manufacturer="m",
+                abv=40 + i % 20, region=region, user=user,
+            ))
+        session.add(region)
+        session.commit()
+
+
+def test_region_page_statements_do_not_grow_with_whiskeys(client, flask_app, monkeypatch):
+    import app
+
+    monkeypatch.setattr(flask_app.jinja_env, "fragment_cache", None)
+    add_region(app.engine, "Lowlands", 1)
+    add_region(app.engine, "Highlands", 50)
+
+    counts = {}
+    for region in ("Lowlands", "Highlands"):
+        with count_statements(app.engine) as statements:
+            response = client.get(f"/regions/{region}")
+        assert response.status_code == 200
+        assert f"{region} 0".encode() in response.data
+        counts[region] = len(statements)
+
+    assert counts["Lowlands"] == counts["Highlands"]
@@ -0,0 +1,82 @@
+"""
+Full-text search at /search/JSON and the FTS5 index behind it.
+"""
+import json
+
+import pytest
+from db_bulk import import_file
+from db_models import Whiskey
+from sqlalchemy import delete, select, update
+
+
+def write_jsonl(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return str(path)
+
+
+def whiskey_row(name, manufacturer, description):
+    return {"name": name, "description": description, "type": "t", "manufacturer": manufacturer,
+            "abv": "40", "region": "Search Glen", "user": "search@x"}
+
+
+def search(client, query):
+    response = client.get(f"/search/JSON?{query}")
+    assert response.status_code == 200
+    return [row["name"] for row in response.get_json()["Results"]]
+
+
+@pytest.fixture(scope="module")
+def catalog(tmp_path_factory):
+    import app
+
+    tmp_path = tmp_path_factory.mktemp("search")
+    import_file(app.engine, "user", write_jsonl(tmp_path / "u.jsonl", [{"name": "Seeker", "email": "search@x"}]))
+    import_file(app.engine, "region", write_jsonl(tmp_path / "r.jsonl", [{"name": "Search Glen", "user": "search@x"}]))
+    import_file(app.engine, "whiskey", write_jsonl(tmp_path / "w.jsonl", [
+        # Added first, so only the ranking can put the others ahead of it
+        whiskey_row("Vextral Blend", "Quillon", "A long note that mentions the vextral cask once "
+                    "among a great many other words about barley, peat, oak and the sea"),
+        whiskey_row("Vextral Cask Strength", "Quillon", "Vextral, vextral and more vextral"),
+        whiskey_row("Zorblaxian Reserve", "Quillon", "Smoky"),
+    ]))
+
+
+def test_terms_match_as_prefixes(client, catalog):
+    assert search(client, "q=zorb") == ["Zorblaxian Reserve"]
+    assert search(client, "q=ZORBLAX+quil") == ["Zorblaxian Reserve"]
+    assert search(client, "q=zorb+nosuchword") == []
+
+
+def test_best_match_first(client, catalog):
+    assert search(client, "q=vextral") == ["Vextral Cask Strength", "Vextral Blend"]
+
+
+@pytest.mark.parametrize("query", ["q=", "q=%22*%22", "q=-+(", "limit=5"])
+def test_queries_without_terms_find_nothing(client, catalog, query):
+    assert search(client, query) == []
+
+
+@pytest.mark.parametrize("limit, count", [("1", 1), ("0", 1), ("-3", 1), ("abc", 2), ("100000", 2)])
+def test_limit(client, catalog, limit, count):
+    assert len(search(client, f"q=vextral&limit={limit}")) == count
+
+
+def test_index_follows_edits_and_deletes(client, catalog, tmp_path):
+    import app
+
+    import_file(app.engine, "whiskey", write_jsonl(tmp_path / "w.jsonl", [
+        whiskey_row("Glimmerwick", "Quillon", "Fruity"),
+    ]))
+    assert search(client, "q=glimmer") == ["Glimmerwick"]
+
+    with app.engine.begin() as conn:
+        whiskey_id = conn.scalar(select(Whiskey.id).where(Whiskey.name == "Glimmerwick"))
+        conn.execute(update(Whiskey).where(Whiskey.id == whiskey_id).values(name="Shadowmere"))
+    assert search(client, "q=glimmer") == []
+    assert search(client, "q=shadowm") == ["Shadowmere"]
+    # Unchanged columns are still indexed
+    assert search(client, "q=shadowmere+fruit") == ["Shadowmere"]
+
+    with app.engine.begin() as conn:
+        conn.execute(delete(Whiskey).where(Whiskey.id == whiskey_id))
+    assert search(client, "q=shadowm") == []
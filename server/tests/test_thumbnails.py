@@ -0,0 +1,30 @@
+"""
+Derivative generation from the background pool.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from blobstore import blob_path
+from thumbnails import DERIVATIVE_SIZES, derivative_path, make_derivatives
+
+Image = pytest.importorskip("PIL.Image")
+
+NAME = "e" * 64 + ".png"
+
+
+def test_concurrent_jobs_for_one_upload(tmp_path):
+    folder = str(tmp_path)
+    path = blob_path(folder, NAME)
+    os.makedirs(os.path.dirname(path))
+    Image.new("RGB", (1200, 900), "brown").save(path)
+
+    # The same photo uploaded twice queues two jobs for one blob
+    with ThreadPoolExecutor(8) as pool:
+        for future in [pool.submit(make_derivatives, folder, NAME) for _ in range(16)]:
+            future.result()
+
+    for size, pixels in DERIVATIVE_SIZES.items():
+        with Image.open(derivative_path(folder, size, NAME)) as image:
+            assert max(image.size) == pixels
+        assert not [f for f in os.listdir(os.path.join(folder, size)) if f.endswith(".tmp")]
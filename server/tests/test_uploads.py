@@ -0,0 +1,104 @@
+"""
+Serving uploads and their derivatives: caching headers, Range requests and
+hand-off to a fronting proxy.
+"""
+from pathlib import Path
+
+import pytest
+from blobstore import blob_path
+from thumbnails import derivative_path
+
+CONTENT = b"0123456789abcdef"
+BLOB = "d" * 64 + ".jpg"
+DIGEST = "d" * 64
+YEAR = 365 * 24 * 60 * 60
+
+
+@pytest.fixture
+def uploads(flask_app, tmp_path, monkeypatch):
+    """
+    An upload folder holding BLOB, its card derivative and a legacy flat
+    upload, label.jpg.
+    """
+    monkeypatch.setitem(flask_app.config, "UPLOAD_FOLDER", str(tmp_path))
+    for path in (blob_path(str(tmp_path), BLOB), derivative_path(str(tmp_path), "card", BLOB),
+                 str(tmp_path / "label.jpg")):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_bytes(CONTENT)
+    return tmp_path
+
+
+def test_blobs_are_immutable(client, uploads):
+    response = client.get(f"/uploads/{BLOB}")
+    assert response.status_code == 200
+    assert response.data == CONTENT
+    assert response.get_etag() == (DIGEST, False)
+    assert response.cache_control.immutable
+    assert response.cache_control.public
+    assert response.cache_control.max_age == YEAR
+
+
+def test_blob_etag_answers_without_the_file(client, uploads):
+    Path(blob_path(str(uploads), BLOB)).unlink()
+    response = client.get(f"/uploads/{BLOB}", headers={"If-None-Match": f'"{DIGEST}"'})
+    assert response.status_code == 304
+    assert response.cache_control.immutable
+
+
+def test_derivatives(client, uploads):
+    card = "d" * 64 + ".webp"
+    response = client.get(f"/uploads/card/{card}")
+    assert response.status_code == 200
+    assert response.data == CONTENT
+    assert response.get_etag() == (f"card-{DIGEST}", False)
+    assert response.cache_control.immutable
+    assert client.get(f"/uploads/poster/{card}").status_code == 404
+    assert client.get(f"/uploads/detail/{card}").status_code == 404
+
+
+def test_legacy_uploads_are_served_from_the_folder_itself(client, flask_app, uploads):
+    response = client.get("/uploads/label.jpg")
+    assert response.status_code == 200
+    assert response.data == CONTENT
+    assert response.get_etag()[0]
+    assert not response.cache_control.immutable
+    assert response.cache_control.max_age == flask_app.config["UPLOAD_MAX_AGE"]
+    assert client.get("/uploads/missing.jpg").status_code == 404
+
+
+@pytest.mark.parametrize("path", [f"/uploads/{BLOB}", "/uploads/label.jpg"])
+def test_range_requests(client, uploads, path):
+    response = client.get(path, headers={"Range": "bytes=2-5"})
+    assert response.status_code == 206
+    assert response.data == CONTENT[2:6]
+    assert response.headers["Content-Range"] == f"bytes 2-5/{len(CONTENT)}"
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+
+def test_x_accel_redirect(client, flask_app, uploads, monkeypatch):
+    monkeypatch.setitem(flask_app.config, "UPLOAD_SENDFILE", "x-accel-redirect")
+
+    response = client.get(f"/uploads/{BLOB}")
+    assert response.status_code == 200
+    assert response.data == b""
+    assert response.mimetype == "image/jpeg"
+    assert response.headers["X-Accel-Redirect"] == f"/protected-uploads/dd/dd/{BLOB}"
+    assert response.cache_control.immutable
+
+    card = "d" * 64 + ".webp"
+    response = client.get(f"/uploads/card/{card}")
+    assert response.headers["X-Accel-Redirect"] == f"/protected-uploads/card/{card}"
+    assert client.get("/uploads/label.jpg").headers["X-Accel-Redirect"] == "/protected-uploads/label.jpg"
+    assert client.get("/uploads/missing.jpg").status_code == 404
+
+
+def test_x_sendfile(client, flask_app, uploads, monkeypatch):
+    monkeypatch.setitem(flask_app.config, "UPLOAD_SENDFILE", "x-sendfile")
+    monkeypatch.setitem(flask_app.config, "USE_X_SENDFILE", True)
+
+    response = client.get(f"/uploads/{BLOB}")
+    assert response.status_code == 200
+    assert response.data == b""
+    assert response.headers["X-Sendfile"] == blob_path(str(uploads), BLOB)
+    assert response.get_etag() == (DIGEST, False)
+    assert response.cache_control.immutable
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+thumbnails.py: Resize uploaded bottle photos into WebP derivatives on a
+background worker pool, so list pages ship small images and the request
+that accepted the upload does not wait for the resize.
+
+Derivatives live in the upload folder as <UPLOAD_FOLDER>/<size>/<stem>.webp.
+Pillow is optional; without it no derivatives are made and pages keep
+serving the original upload.
+
+Run as a script to generate derivatives for uploads that predate them:
+    python thumbnails.py [upload_folder]
+"""
+import logging
+import os
+import sys
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Final, Optional
+
+from blobstore import blob_path
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+log = logging.getLogger(__name__)
+
+# Longest edge in pixels of each derivative
+DERIVATIVE_SIZES: Final = {
+    "card": 400,  # region listings
+    "detail": 800,  # single brand page
+}
+DERIVATIVE_EXT: Final[str] = ".webp"
+WEBP_QUALITY: Final[int] = 80
+
+def _new_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=int(os.environ.get("THUMBNAIL_WORKERS", "2")),
+        thread_name_prefix="thumbnails",
+    )
+
+
+def _reset_executor_after_fork() -> None:
+    # Threads do not survive fork; give each worker process its own pool
+    global _executor
+    _executor = _new_executor()
+
+
+_executor = _new_executor()
+os.register_at_fork(after_in_child=_reset_executor_after_fork)
+
+
+# ---------------------------------
+# Paths
+# ---------------------------------
+def derivative_name(filename: str) -> str:
+    """
+    File name of every derivative of filename, e.g. bottle.jpg -> bottle.webp.
+    """
+    return os.path.splitext(filename)[0] + DERIVATIVE_EXT
+
+
+def derivative_path(folder: str, size: str, filename: str) -> str:
+    return os.path.join(folder, size, derivative_name(filename))
+
+
+def has_derivative(folder: str, size: str, filename: str) -> bool:
+    return os.path.exists(derivative_path(folder, size, filename))
+
+
+def makes_derivatives() -> bool:
+    """
+    False when Pillow is missing and no derivative will ever be written.
+    """
+    return Image is not None
+
+
+# ---------------------------------
+# Resizing
+# ---------------------------------
+def make_derivatives(folder: str, filename: str) -> None:
+    """
+    Write one WebP per DERIVATIVE_SIZES entry for folder/filename.
+    Each file is written under a unique temporary name and renamed into
+    place, so a page never links to a half-written image and two jobs for
+    the same upload do not trip over each other.
+    """
+    with Image.open(blob_path(folder, filename)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+
+        for size, pixels in DERIVATIVE_SIZES.items():
+            target = derivative_path(folder, size, filename)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            resized = image.copy()
+            resized.thumbnail((pixels, pixels))
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(target), suffix=".tmp", delete=False) as tmp:
+                try:
+                    resized.save(tmp, "WEBP", quality=WEBP_QUALITY)
+                except BaseException:
+                    os.remove(tmp.name)
+                    raise
+            os.replace(tmp.name, target)
+
+
+def _log_failure(future: Future) -> None:
+    exc = future.exception()
+    if exc is not None:
+        log.error("Thumbnail generation failed: %s", exc)
+
+
+def queue_derivatives(folder: str, filename: str) -> Optional[Future]:
+    """
+    Schedule derivative generation for an upload and return immediately.
+    Returns None when Pillow is not installed.
+    """
+    if Image is None:
+        return None
+    future = _executor.submit(make_derivatives, folder, filename)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def remove_derivatives(folder: str, filename: str) -> None:
+    """
+    Delete every derivative of filename, ignoring ones that do not exist.
+    """
+    for size in DERIVATIVE_SIZES:
+        try:
+            os.remove(derivative_path(folder, size, filename))
+        except FileNotFoundError:
+            pass
+
+
+# -----------------------
+# Entry point for script
+# -----------------------
+if __name__ == "__main__":
+    if Image is None:
+        sys.exit("Pillow is not installed: pip install pillow")
+
+    upload_folder = sys.argv[1] if len(sys.argv) > 1 else "./uploads"
+    for root, dirs, files in os.walk(upload_folder):
+        # Skip derivative and temporary directories at the top level
+        if root == upload_folder:
+            dirs[:] = [d for d in dirs if d not in DERIVATIVE_SIZES and d != "tmp"]
+        for name in sorted(files):
+            try:
+                make_derivatives(upload_folder, name)
+                print(f"Resized {name}")
+            except OSError as e:
+                print(f"Skipped {name}: {e}")
@@ -0,0 +1,27 @@
+"""
+wsgi.py: Production entry point for WSGI servers.
+
+Import this module once in the server's master process and fork the
+workers from it, so templates, mappers and the app itself are loaded once
+and shared copy-on-write:
+
+    cd server
+    python db_migrate.py                 # create/upgrade tables on deploy
+    SECRET_KEY=... gunicorn --preload --workers 4 --threads 8 \\
+        --bind 0.0.0.0:8000 wsgi:application
+
+uWSGI behaves the same way without --lazy-apps. Each forked worker drops the
+connections inherited in its engine pools and opens its own (see
+dispose_pools_after_fork in app.py). Workers do not create tables unless
+DB_CREATE_ALL=true.
+"""
+import os
+
+from app import create_app
+
+application = create_app(
+    create_tables=os.environ.get("DB_CREATE_ALL", "false").lower() == "true"
+)
+
+if not application.secret_key:
+    raise RuntimeError("Set SECRET_KEY to sign login sessions.")